@@ -1,12 +1,57 @@
 from aiohttp import web
 from app.middlewares import setup_middlewares
 from app.routes import setup_routes
+from app.models.bot import VoiceBot
+from app.services.core.knowledge_base import KnowledgeBaseRefresher
+from app.services.ext.elvnlabs import ELEVENLABS_POOL
+from app.models.bot import Voices
+from app.services.core.chat_history import get_encoding
+from config import WARM_UP_KNOWLEDGE_BASES, KNOWLEDGE_BASE_REFRESH_INTERVAL, ELEVENLABS_POOL_SIZE
+import asyncio
+
+async def warm_up_knowledge_bases(app: web.Application):
+    # Build the shared indexes off the event loop so the first call doesn't pay for them
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, VoiceBot.warm_up)
+
+async def warm_up_token_encoding(app: web.Application):
+    # May download the BPE file, a failure only leaves token counts approximate
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, get_encoding)
+
+async def start_knowledge_base_refresher(app: web.Application):
+    app["knowledge_base_refresher"] = KnowledgeBaseRefresher(KNOWLEDGE_BASE_REFRESH_INTERVAL)
+    app["knowledge_base_refresher"].start()
+
+async def stop_knowledge_base_refresher(app: web.Application):
+    await app["knowledge_base_refresher"].stop()
+
+async def start_elevenlabs_pool(app: web.Application):
+    # Other voices join the pool the first time a call uses them
+    ELEVENLABS_POOL.ensure(Voices.KAJEN.value)
+    ELEVENLABS_POOL.start()
+
+async def stop_elevenlabs_pool(app: web.Application):
+    await ELEVENLABS_POOL.stop()
 
 def create_app() -> web.Application:
     app = web.Application()
     
     setup_middlewares(app)
     setup_routes(app)
+
+    app.on_startup.append(warm_up_token_encoding)
+
+    if WARM_UP_KNOWLEDGE_BASES:
+        app.on_startup.append(warm_up_knowledge_bases)
+
+    if KNOWLEDGE_BASE_REFRESH_INTERVAL > 0:
+        app.on_startup.append(start_knowledge_base_refresher)
+        app.on_cleanup.append(stop_knowledge_base_refresher)
+
+    if ELEVENLABS_POOL_SIZE > 0:
+        app.on_startup.append(start_elevenlabs_pool)
+        app.on_cleanup.append(stop_elevenlabs_pool)
     
     return app
 
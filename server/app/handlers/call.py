@@ -5,6 +5,7 @@ from app.services.core.observers import (
     VoiceAgentObserver,
     CallEvent,
     VoiceAgentEvent,
+    DispatchMode,
 )
 from app.services.core.voice_agent import VoiceAgent
 from app.services.ext.elvnlabs import ElevenLabsClient
@@ -63,8 +64,10 @@ async def call_handler(request: web.Request):
     )
     
     call_observer.add_event_listener(CallEvent.AUDIO_CHUNK, voice_agent.put_raw_audio)
-    call_observer.add_event_listener(CallEvent.CALL_ENDED, voice_agent.stop)
-    call_observer.add_event_listener(CallEvent.CALL_ENDED, finalize_call)
+    call_observer.add_event_listener(CallEvent.PLAYBACK_UPDATED, voice_agent.on_playback_updated)
+    # Teardown and the post-call update shouldn't hold up the Twilio read loop
+    call_observer.add_event_listener(CallEvent.CALL_ENDED, voice_agent.stop, DispatchMode.QUEUED)
+    call_observer.add_event_listener(CallEvent.CALL_ENDED, finalize_call, DispatchMode.QUEUED)
 
     voice_agent_observer.add_event_listener(
         VoiceAgentEvent.AUDIO_GENERATED, call_stream_client.send_audio
@@ -4,6 +4,8 @@ from twilio.rest import Client
 from config import HOST_DOMAIN, TWILIO_AUTH_TOKEN, TWILIO_ACCOUNT_SID
 from app.utils.misc import is_json_serializable
 import json
+import asyncio
+from functools import partial
 from app.services.core.userdata import UserDataService
 
 async def dispatch_call(request : web.Request):
@@ -24,9 +26,8 @@ async def dispatch_call(request : web.Request):
             print("Error loading json: ", value, "Error: ", e)
 
     user_data_service = UserDataService()
-    user_data_service.load_data_from_id(custom_params.get("user_id"))
-    user_data_service.fetch_goals()
-    user_data_service.fetch_habits()
+    await user_data_service.aload_data_from_id(custom_params.get("user_id"))
+    await user_data_service.afetch_goals_and_habits()
 
     custom_params["goals"] = user_data_service.get_goals_string()
     custom_params["actions"] = user_data_service.get_habits_string()
@@ -40,10 +41,12 @@ async def dispatch_call(request : web.Request):
 
     print(twiml_response.to_xml())
 
-    call = client.calls.create(
+    # The Twilio REST client blocks on its HTTP request
+    call = await asyncio.get_running_loop().run_in_executor(None, partial(
+        client.calls.create,
         to=target_phone_number,
         from_="+1 855 910 0592",
         twiml=twiml_response.to_xml()
-    )
+    ))
 
     return web.json_response({"call_id": call.sid})
\ No newline at end of file
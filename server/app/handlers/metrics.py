@@ -0,0 +1,34 @@
+from aiohttp import web
+import asyncio
+from app.services.core.response_tools import (
+    EMBEDDING_CACHE,
+    RETRIEVAL_CACHE,
+    EMBEDDING_BATCHER,
+    TURN_CLASSIFIER,
+)
+from app.services.core.speculation import SPECULATION_STATS
+from app.services.ext.azure_ai import http_pool_stats
+from app.services.core.flush_controller import FlushController
+from app.services.core.voice_agent import barge_in_stats
+from app.services.ext.elvnlabs import ELEVENLABS_POOL
+from app.services.core.observers import listener_stats
+from scheduler.post_call import post_call_stats
+
+async def metrics_handler(request : web.Request):
+
+    # Talks to the broker and Redis, keep it off the event loop
+    post_call = await asyncio.get_running_loop().run_in_executor(None, post_call_stats)
+
+    return web.json_response({
+        "embedding_cache": EMBEDDING_CACHE.stats(),
+        "retrieval_cache": RETRIEVAL_CACHE.stats(),
+        "embedding_batcher": EMBEDDING_BATCHER.stats(),
+        "turn_classifier": TURN_CLASSIFIER.stats(),
+        "speculation": SPECULATION_STATS,
+        "llm_http_pool": http_pool_stats(),
+        "tts_flush": FlushController.stats(),
+        "barge_in": barge_in_stats(),
+        "elevenlabs": ELEVENLABS_POOL.stats(),
+        "event_listeners": listener_stats(),
+        "post_call": post_call,
+    })
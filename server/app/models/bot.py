@@ -1,8 +1,10 @@
 from dataclasses import dataclass
 from enum import Enum
-from app.services.core.response_tools import vector_store_from_gsheet
+from app.services.core.knowledge_base import KnowledgeBaseRegistry
+from app.services.core.response_tools import RETRIEVAL_CACHE
+from app.services.core.segmenter import SegmenterConfig
 from typing import ClassVar, Optional
-from langchain_community.vectorstores import FAISS
+from langchain_core.vectorstores import VectorStore
 
 
 class Voices(Enum):
@@ -11,7 +13,11 @@ class Voices(Enum):
 @dataclass(frozen=True)
 class Bot:
     id : str
-    knowledge_base : Optional[FAISS] = None
+    knowledge_source : Optional[str] = None
+
+    @property
+    def knowledge_base(self) -> Optional[VectorStore]:
+        return KnowledgeBaseRegistry.get(self.knowledge_source)
 
 @dataclass(frozen=True)
 class VoiceBot(Bot):
@@ -19,6 +25,7 @@ class VoiceBot(Bot):
     sys_prompt : str = ""
     leading_prompt : str = ""
     voice : Voices = Voices.KAJEN
+    segmenter_config : SegmenterConfig = SegmenterConfig()
 
     _voice_bots : ClassVar[dict[str : "VoiceBot"]] = {}       
 
@@ -29,19 +36,42 @@ class VoiceBot(Bot):
 
     @classmethod
     def get_bot(cls, id : str) -> Optional["VoiceBot"]:
-        return cls._voice_bots.get(id)
+        bot = cls._voice_bots.get(id)
+        if bot is not None:
+            # Builds the shared index on first request unless warm_up already did
+            KnowledgeBaseRegistry.get(bot.knowledge_source)
+        return bot
+
+    @classmethod
+    async def aget_bot(cls, id : str) -> Optional["VoiceBot"]:
+        # Same as get_bot, but a first-use build doesn't stall the calls sharing the event loop
+        bot = cls._voice_bots.get(id)
+        if bot is not None:
+            await KnowledgeBaseRegistry.aget(bot.knowledge_source)
+        return bot
+
+    @classmethod
+    def warm_up(cls):
+        KnowledgeBaseRegistry.warm_up()
+
+    @classmethod
+    def on_knowledge_base_reloaded(cls, source : str):
+        for bot in cls._voice_bots.values():
+            if bot.knowledge_source == source:
+                RETRIEVAL_CACHE.invalidate(bot.id)
     
 @dataclass()
 class BotBuilder:
     id : str
-    knowledge_base : Optional[FAISS] = None
+    knowledge_source : Optional[str] = None
 
     def with_gsheet(self, gsheet_url : str):
-        self.knowledge_base = vector_store_from_gsheet(gsheet_url)
+        KnowledgeBaseRegistry.register(gsheet_url)
+        self.knowledge_source = gsheet_url
         return self
     
     def build(self):
-        return Bot(id=self.id, knowledge_base=self.knowledge_base)
+        return Bot(id=self.id, knowledge_source=self.knowledge_source)
 
 @dataclass()
 class VoiceBotBuilder(BotBuilder):
@@ -49,10 +79,15 @@ class VoiceBotBuilder(BotBuilder):
     sys_prompt : str = ""
     leading_prompt : str = ""
     voice : Voices = Voices.KAJEN
+    segmenter_config : SegmenterConfig = SegmenterConfig()
 
     def with_voice(self, voice : Voices):
         self.voice = voice
         return self
+
+    def with_segmenter_config(self, segmenter_config : SegmenterConfig):
+        self.segmenter_config = segmenter_config
+        return self
     
     def load_prompts(self):
         with open(f"resources/prompts/{self.id}/main.txt", "r") as f:
@@ -61,7 +96,9 @@ class VoiceBotBuilder(BotBuilder):
         return self
         
     def build(self):
-        return VoiceBot(id=self.id, knowledge_base=self.knowledge_base, sys_prompt=self.sys_prompt, leading_prompt=self.leading_prompt, voice=self.voice)
+        return VoiceBot(id=self.id, knowledge_source=self.knowledge_source, sys_prompt=self.sys_prompt, leading_prompt=self.leading_prompt, voice=self.voice, segmenter_config=self.segmenter_config)
+
+KnowledgeBaseRegistry.add_reload_listener(VoiceBot.on_knowledge_base_reloaded)
 
 MASTER_GSHEET = "https://docs.google.com/spreadsheets/d/1C8wde5O5lF05mmwsRMHcSXkz9_CI-KjTqB5EiGc47Os/edit?usp=sharing"
 
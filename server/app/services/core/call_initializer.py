@@ -22,7 +22,7 @@ class CallInitializer:
 
         print("Bot id: ", bot_id)
 
-        self.call_context.bot = VoiceBot.get_bot(bot_id)
+        self.call_context.bot = await VoiceBot.aget_bot(bot_id)
 
         print("Bot: ", self.call_context.bot)
 
@@ -0,0 +1,151 @@
+import asyncio
+import time
+from typing import Optional
+import tiktoken
+from langchain.memory import ChatMessageHistory
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from app.services.ext.azure_ai import get_llm
+from config import AzureModels
+
+TOKENS_PER_MESSAGE = 4
+
+# A failed load is retried after this long, counts are approximate until then
+ENCODING_RETRY_INTERVAL = 300
+
+_encoding: Optional[tiktoken.Encoding] = None
+_encoding_failed_at: Optional[float] = None
+
+
+def get_encoding() -> Optional[tiktoken.Encoding]:
+    """The gpt-4o encoding, or None while it can't be loaded.
+
+    The first load may download the BPE file, so a missing network never breaks a call.
+    """
+    global _encoding, _encoding_failed_at
+    if _encoding is None:
+        if _encoding_failed_at is not None and time.monotonic() - _encoding_failed_at < ENCODING_RETRY_INTERVAL:
+            return None
+        try:
+            _encoding = tiktoken.encoding_for_model(AzureModels.gpt_4o.value)
+        except Exception as e:
+            print("Error loading tiktoken encoding, approximating token counts: ", e)
+            _encoding_failed_at = time.monotonic()
+    return _encoding
+
+
+def count_tokens(messages: list[BaseMessage]) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        return sum(len(message.content) // 4 + TOKENS_PER_MESSAGE for message in messages)
+    return sum(len(encoding.encode(message.content)) + TOKENS_PER_MESSAGE for message in messages)
+
+
+class ChatHistoryManager:
+    """Token-budgeted view over a call's chat history.
+
+    The full history is kept for the post-call transcript, but the prompt only
+    gets the last ``keep_turns`` turns verbatim plus a rolling summary of
+    everything before them. Summaries are computed in a background task between
+    turns, so a response never waits on one.
+    """
+
+    def __init__(
+        self,
+        history: ChatMessageHistory,
+        token_budget: int = 2000,
+        keep_turns: int = 6,
+        summary_model: AzureModels = AzureModels.gpt_4o_mini,
+    ):
+        self.history = history
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.summary_model = summary_model
+
+        self.summary = ""
+        self.summarized_upto = 0
+        self._summary_task: Optional[asyncio.Task] = None
+        # Token count per history message, messages are never edited once appended
+        self._token_counts: list[int] = []
+
+    def add_user_message(self, message: str):
+        self.history.add_user_message(message)
+
+    def add_ai_message(self, message: str):
+        self.history.add_ai_message(message)
+        self.schedule_summary()
+
+    @property
+    def messages(self) -> list[BaseMessage]:
+        window = self.history.messages[self.summarized_upto:]
+        recent_start = self._recent_start(window)
+
+        # Until the summary catches up, drop the oldest unsummarized turns rather than blow the budget
+        counts = self._message_token_counts()[self.summarized_upto:]
+        total = sum(counts)
+        dropped = 0
+        while dropped < recent_start and total > self.token_budget:
+            total -= counts[dropped]
+            dropped += 1
+        window = window[dropped:]
+
+        if self.summary:
+            window = [SystemMessage(content=f"Summary of the earlier conversation: {self.summary}")] + window
+        return window
+
+    def _message_token_counts(self) -> list[int]:
+        messages = self.history.messages
+        if len(self._token_counts) > len(messages):
+            # The history was cleared
+            self._token_counts = []
+        for message in messages[len(self._token_counts):]:
+            self._token_counts.append(count_tokens([message]))
+        return self._token_counts
+
+    def _recent_start(self, messages: list[BaseMessage]) -> int:
+        """Index of the first message belonging to the last keep_turns user turns."""
+        turns = 0
+        for i in range(len(messages) - 1, -1, -1):
+            if isinstance(messages[i], HumanMessage):
+                turns += 1
+                if turns == self.keep_turns:
+                    return i
+        return 0
+
+    def schedule_summary(self):
+        if self._summary_task is not None and not self._summary_task.done():
+            return
+
+        window = self.history.messages[self.summarized_upto:]
+        boundary = self._recent_start(window)
+        if boundary == 0 or sum(self._message_token_counts()[self.summarized_upto:]) <= self.token_budget:
+            return
+
+        self._summary_task = asyncio.create_task(
+            self._summarize(window[:boundary], self.summarized_upto + boundary)
+        )
+
+    async def _summarize(self, messages: list[BaseMessage], upto: int):
+        transcript = "\n".join(
+            f"{'User' if isinstance(message, HumanMessage) else 'Coach'}: {message.content}"
+            for message in messages
+        )
+        prompt = f"""Update the running summary of a coaching call with the new lines below. Keep every goal, habit, commitment, number and personal detail the user mentioned. Answer with the summary only, in at most 150 words.
+
+Current summary:
+{self.summary or "(none)"}
+
+New lines:
+{transcript}"""
+
+        try:
+            response = await get_llm(self.summary_model).ainvoke(prompt)
+        except Exception as e:
+            print("Error summarizing chat history: ", e)
+            return
+
+        self.summary = response.content.strip()
+        self.summarized_upto = upto
+
+    async def close(self):
+        if self._summary_task is not None and not self._summary_task.done():
+            self._summary_task.cancel()
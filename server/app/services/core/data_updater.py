@@ -7,6 +7,8 @@ from langchain_core.messages import (
     AIMessageChunk,
 )
 import app.services.core.evaluation as evaluation
+from scheduler.post_call import enqueue_post_call
+import asyncio
 
 class DataUpdateService:
     def __init__(self, 
@@ -27,9 +29,21 @@ class DataUpdateService:
         print("*** FINAL TRANSCRIPT USED FOR REVIEW ***")
         print(transcript)
         print("\n")
-        print("Thinking...")
-        # Get the goals and actions from the transcript and update the database
-        evaluation.setup_up_call_update(transcript, self.context.user_id)
+
+        if not transcript or not self.context.call_id:
+            return
+
+        # The LLM and Firestore work runs on a Celery worker, only the publish happens here
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                None, enqueue_post_call, self.context.call_id, self.context.user_id, transcript
+            )
+            print("Queued post-call update for call: ", self.context.call_id)
+        except Exception as e:
+            # Don't lose the call if the broker is down, run it here off the event loop instead
+            print("Error queueing post-call update, running it locally: ", e)
+            await loop.run_in_executor(None, evaluation.setup_up_call_update, transcript, self.context.user_id)
 
 
 
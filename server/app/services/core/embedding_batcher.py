@@ -0,0 +1,91 @@
+import asyncio
+import time
+from typing import Optional
+from langchain_core.embeddings import Embeddings
+from app.utils.metrics import LatencyHistogram
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent query embeddings into batched embed_documents calls.
+
+    Requests arriving within ``max_wait`` seconds of the first pending one are sent
+    together, and a batch is sent immediately once it reaches ``max_batch_size``.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = 64, max_wait: float = 0.005):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self.batches = 0
+        self.texts = 0
+        self.queue_wait = LatencyHistogram()
+        self.request_latency = LatencyHistogram()
+        self.total_latency = LatencyHistogram()
+
+        self._pending: list[tuple[str, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def aembed_query(self, text: str) -> list[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        start = time.perf_counter()
+        self._pending.append((text, future, start))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        vector = await future
+        self.total_latency.observe(time.perf_counter() - start)
+        return vector
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: list[tuple[str, asyncio.Future, float]]):
+        now = time.perf_counter()
+        for _, _, enqueued in batch:
+            self.queue_wait.observe(now - enqueued)
+
+        # Identical utterances in the same window share one input
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+        self.batches += 1
+        self.texts += len(texts)
+
+        try:
+            vectors = await self.embeddings.aembed_documents(texts)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.request_latency.observe(time.perf_counter() - now)
+
+        by_text = dict(zip(texts, vectors))
+        for text, future, _ in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "mean_batch_size": self.texts / self.batches if self.batches else 0.0,
+            "queue_wait": self.queue_wait.snapshot(),
+            "request_latency": self.request_latency.snapshot(),
+            "total_latency": self.total_latency.snapshot(),
+        }
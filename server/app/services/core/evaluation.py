@@ -1,5 +1,5 @@
-import re
 import app.services.ext.firebase_db as firebase_db
+from pydantic import BaseModel, Field
 from app.services.ext.azure_ai import get_llm
 from config import AzureModels
 
@@ -10,43 +10,39 @@ def openai_call(prompt: str):
     return response.content.strip()
 
 
-def setup_evaluation(transcript: str):
-    # Extract goals
-    # Extract 2 daily actions
-    prompt = f"""From the following transcript, extract the goals and the 2 daily actions.
-{transcript}
+class DailyAction(BaseModel):
+    description: str = Field(description="The daily action, as the user described it")
+    title: str = Field(
+        description='Title to display in the app, at most 2 words. For example "Water" for drinking water every day or "Vaping" for quitting vaping'
+    )
+
+
+class CallUpdate(BaseModel):
+    goals: list[str] = Field(description="The user's 2 long term goals")
+    actions: list[DailyAction] = Field(description="The 2 daily actions the user committed to")
 
-Extract the goals and 2 daily action in the following format:
 
-Goal 1: [goal 1]
-Goal 2: [goal 2]
+EXTRACTION_PROMPT = """From the following coaching call transcript, extract the user's 2 long term goals and the 2 daily actions they committed to, each with a short title.
 
-Daily Action 1: [daily action 1]
-Daily Action 2: [daily action 2]"""
-    
-    ai_response = openai_call(prompt)
+{transcript}"""
 
-    return ai_response
+_extractor = None
 
 
-def extract_goals_and_actions(response: str):
-    goals_and_actions = {
-        'goal1': re.search(r'Goal 1: (.*?)(?:\n|$)', response).group(1),
-        'goal2': re.search(r'Goal 2: (.*?)(?:\n|$)', response).group(1),
-        'action1': re.search(r'Daily Action 1: (.*?)(?:\n|$)', response).group(1),
-        'action2': re.search(r'Daily Action 2: (.*?)(?:\n|$)', response).group(1)
-    }
+def get_extractor():
+    # One structured-output call replaces the goal extraction and the per-action title calls
+    global _extractor
+    if _extractor is None:
+        _extractor = get_llm(AzureModels.gpt_4o).with_structured_output(CallUpdate, method="json_schema", strict=True)
+    return _extractor
 
-    return goals_and_actions
 
+def extract_call_update(transcript: str) -> CallUpdate:
+    return get_extractor().invoke(EXTRACTION_PROMPT.format(transcript=transcript))
 
-def extract_action_name(action_description: str):
-    prompt = f"""From the action description below shorten it into a title that I can display in an app that encaspulates the action.Extract the name of the action in the following format and keep in less than 2 words. For example if the user says they want to drink water everyday the action name is "Water" or if they said they want to quit vaping the action name is "Vaping":
-Action Description: {action_description}
-Action Title:"""
-        
-    ai_response = openai_call(prompt)
-    return ai_response
+
+async def aextract_call_update(transcript: str) -> CallUpdate:
+    return await get_extractor().ainvoke(EXTRACTION_PROMPT.format(transcript=transcript))
 
 
 def call_time_extractor(transcript: str):
@@ -62,38 +58,28 @@ Call Time: 13:00"""
 
 # Function to create a user
 def setup_up_call_update(transcript: str, user_id: str):
-    # Extract goals and actions
-    goals_ai_extraction = setup_evaluation(transcript)
-    goals_and_actions = extract_goals_and_actions(goals_ai_extraction)
-
+    call_update = extract_call_update(transcript)
 
-    print("\nExtracted goals and actions: ", goals_and_actions)
+    print("\nExtracted goals and actions: ", call_update)
 
-    # Get long term goals and action descriptions
-    ltg_1_description = goals_and_actions['goal1']
-    ltg_2_description = goals_and_actions['goal2']
+    apply_call_update(user_id, call_update)
 
-    action_1_description = goals_and_actions['action1']
-    action_2_description = goals_and_actions['action2']
 
-    # Shorten long term goals to 2 words
-    action_title_1 = extract_action_name(action_1_description).replace('"', '')
-    action_title_2 = extract_action_name(action_2_description).replace('"', '')
-
-    print("\Determined action titles: ", action_title_1, action_title_2)
-
-    # Update long term goals
-    firebase_db.create_long_term_goals(user_id, [ltg_1_description, ltg_2_description])
-
-    # Update daily actions
-    firebase_db.add_habit(user_id, action_title_1, action_1_description)
-    firebase_db.add_habit(user_id, action_title_2, action_2_description)
+def apply_call_update(user_id: str, call_update: CallUpdate):
+    # Long term goals and the new daily actions land in one write
+    firebase_db.update_user_goals(
+        user_id,
+        long_term_goals=call_update.goals[:2],
+        habits=[
+            firebase_db.build_habit(action.title.replace('"', ''), action.description)
+            for action in call_update.actions[:2]
+        ],
+    )
 
     print("Updated user profile :)")
 
 
 
-
 # sample_transcript = """Coach: Hi Michael, Im Goggins, your personal life coach. Hows it going?
 # User: Im good, how are you?
 
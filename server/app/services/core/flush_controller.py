@@ -0,0 +1,149 @@
+import dataclasses
+import math
+import time
+from collections import deque
+from typing import Optional
+from app.services.core.segmenter import SegmenterConfig
+from app.utils.metrics import LatencyHistogram
+
+FLUSH_METRICS = {
+    "tts_latency": LatencyHistogram(),
+    "turns": deque(maxlen=200),
+}
+
+
+class FlushController:
+    """Tunes TTS segment sizes per call from measured synthesis latency and token rate.
+
+    Audio plays without gaps when each segment lasts at least as long as it takes
+    to generate and synthesize the next one:
+
+        W / speech_rate >= W / word_rate + tts_latency
+
+    The smallest such W is used for the first segment of a turn (bounded by the
+    bot's configured first_max_words), so audio starts as early as the pipeline
+    allows. Later segments keep the bot's sizes unless slow synthesis needs more
+    headroom.
+    """
+
+    def __init__(
+        self,
+        call_id: str = "",
+        speech_rate: float = 2.6,
+        min_words: int = 3,
+        max_words: int = 40,
+        smoothing: float = 0.3,
+    ):
+        self.call_id = call_id
+        self.speech_rate = speech_rate
+        self.min_words = min_words
+        self.max_words = max_words
+        self.smoothing = smoothing
+
+        self.tts_latency: Optional[float] = None
+        self.word_rate: Optional[float] = None
+
+        self._flush_sent_at: Optional[float] = None
+        self._first_flush_of_turn = True
+        self._first_token_at: Optional[float] = None
+        self._last_token_at: Optional[float] = None
+        self._turn_words = 0
+        self._turn_config: Optional[SegmenterConfig] = None
+        self._sample_word_rate = True
+
+    def _smooth(self, current: Optional[float], sample: float) -> float:
+        if current is None:
+            return sample
+        return (1 - self.smoothing) * current + self.smoothing * sample
+
+    def start_turn(self, base: SegmenterConfig, replayed: bool = False) -> SegmenterConfig:
+        """Segment sizes for the next turn.
+
+        Tokens of a replayed turn, such as a committed speculative response, arrive from a
+        buffer much faster than the model generates them, so they don't update word_rate.
+        """
+        self._first_flush_of_turn = True
+        self._sample_word_rate = not replayed
+        self._flush_sent_at = None
+        self._first_token_at = None
+        self._last_token_at = None
+        self._turn_words = 0
+        self._turn_config = self._tune(base)
+        return self._turn_config
+
+    def on_token(self, text: str):
+        now = time.perf_counter()
+        if self._first_token_at is None:
+            self._first_token_at = now
+        self._last_token_at = now
+        self._turn_words += text.count(" ")
+
+    def on_flush(self):
+        # Only the first flush of a turn hits an idle synthesizer, later ones queue behind it
+        if self._first_flush_of_turn:
+            self._flush_sent_at = time.perf_counter()
+            self._first_flush_of_turn = False
+
+    def on_interrupt(self):
+        # Audio still on its way for the cancelled turn must not be timed against a later flush
+        self._flush_sent_at = None
+        self._first_flush_of_turn = False
+
+    def on_audio(self):
+        if self._flush_sent_at is None:
+            return
+        latency = time.perf_counter() - self._flush_sent_at
+        self._flush_sent_at = None
+        self.tts_latency = self._smooth(self.tts_latency, latency)
+        FLUSH_METRICS["tts_latency"].observe(latency)
+
+    def end_turn(self):
+        if self._sample_word_rate and self._first_token_at is not None and self._turn_words > 0:
+            duration = self._last_token_at - self._first_token_at
+            if duration > 0.1:
+                self.word_rate = self._smooth(self.word_rate, self._turn_words / duration)
+
+        if self._turn_config is not None:
+            FLUSH_METRICS["turns"].append({
+                "call_id": self.call_id,
+                "tts_latency": self.tts_latency,
+                "word_rate": self.word_rate,
+                "first_max_words": self._turn_config.first_max_words,
+                "max_words": self._turn_config.max_words,
+                "first_comma_min_words": self._turn_config.first_comma_min_words,
+                "comma_min_words": self._turn_config.comma_min_words,
+            })
+
+    def _gap_free_words(self) -> Optional[int]:
+        if self.tts_latency is None or self.word_rate is None:
+            return None
+        if self.word_rate <= self.speech_rate:
+            # Generation can't outpace speech, no segment size avoids gaps
+            return None
+        words = self.tts_latency / (1 / self.speech_rate - 1 / self.word_rate)
+        return min(max(math.ceil(words), self.min_words), self.max_words)
+
+    def _tune(self, base: SegmenterConfig) -> SegmenterConfig:
+        gap_free = self._gap_free_words()
+        if gap_free is None:
+            return base
+
+        first_max_words = min(gap_free, base.first_max_words)
+        max_words = min(max(base.max_words, 2 * gap_free), self.max_words)
+
+        return dataclasses.replace(
+            base,
+            first_max_words=first_max_words,
+            max_words=max_words,
+            first_comma_min_words=max(
+                1, round(first_max_words * base.first_comma_min_words / base.first_max_words)
+            ),
+            comma_min_words=max(1, round(max_words * base.comma_min_words / base.max_words)),
+        )
+
+    @staticmethod
+    def stats() -> dict:
+        return {
+            "tts_latency": FLUSH_METRICS["tts_latency"].snapshot(),
+            "recent_turns": list(FLUSH_METRICS["turns"])[-20:],
+        }
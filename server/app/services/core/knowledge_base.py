@@ -0,0 +1,147 @@
+import asyncio
+import threading
+from typing import Callable, ClassVar, Optional
+from langchain_core.vectorstores import VectorStore
+from app.services.core.response_tools import (
+    gsheet_rows,
+    row_id,
+    vector_store_from_rows,
+    apply_rows_diff,
+    CACHED_EMBEDDINGS,
+)
+from app.services.core.mmap_store import SnapshotStore
+from config import VECTOR_STORE_BACKEND, VECTOR_STORE_DIR
+
+
+class KnowledgeBaseRegistry:
+    """Process-wide registry of knowledge bases keyed by source URL.
+
+    Bots sharing a source share one index. Indexes are built on first use, or ahead
+    of time through ``warm_up``, and replaced wholesale by ``refresh`` so readers
+    holding the previous store are never affected.
+    """
+
+    _readers: ClassVar[dict[str, Callable[[str], list[str]]]] = {}
+    _stores: ClassVar[dict[str, VectorStore]] = {}
+    _locks: ClassVar[dict[str, threading.Lock]] = {}
+    _registry_lock: ClassVar[threading.Lock] = threading.Lock()
+    _reload_listeners: ClassVar[list[Callable[[str], None]]] = []
+
+    @classmethod
+    def register(cls, source: str, reader: Callable[[str], list[str]] = gsheet_rows):
+        with cls._registry_lock:
+            cls._readers.setdefault(source, reader)
+            cls._locks.setdefault(source, threading.Lock())
+
+    @classmethod
+    def add_reload_listener(cls, func: Callable[[str], None]):
+        cls._reload_listeners.append(func)
+
+    @classmethod
+    def get(cls, source: Optional[str]) -> Optional[VectorStore]:
+        if source is None:
+            return None
+
+        store = cls._stores.get(source)
+        if store is not None:
+            return store
+
+        if source not in cls._readers:
+            raise KeyError(f"Knowledge base source {source} is not registered")
+
+        with cls._locks[source]:
+            if source not in cls._stores:
+                print(f"Building knowledge base from {source}")
+                cls._stores[source] = cls._build(source)
+            return cls._stores[source]
+
+    @classmethod
+    async def aget(cls, source: Optional[str]) -> Optional[VectorStore]:
+        """``get`` for the event loop, a first-use build runs in the default executor."""
+
+        store = cls._stores.get(source) if source is not None else None
+        if store is not None:
+            return store
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, cls.get, source)
+
+    @classmethod
+    def _build(cls, source: str) -> VectorStore:
+        reader = cls._readers[source]
+        if VECTOR_STORE_BACKEND == "mmap":
+            # Reuses a snapshot published by another worker or a previous run
+            return SnapshotStore(VECTOR_STORE_DIR, source, CACHED_EMBEDDINGS.model).load_or_build(
+                lambda: reader(source), row_id, CACHED_EMBEDDINGS
+            )
+        return vector_store_from_rows(reader(source))
+
+    @classmethod
+    def _updated(cls, source: str, store: VectorStore, rows: list[str]) -> Optional[VectorStore]:
+        if VECTOR_STORE_BACKEND == "mmap":
+            return SnapshotStore(VECTOR_STORE_DIR, source, CACHED_EMBEDDINGS.model).refresh(
+                store, rows, row_id, CACHED_EMBEDDINGS
+            )
+        return apply_rows_diff(store, rows)
+
+    @classmethod
+    def refresh(cls, source: str) -> bool:
+        """Re-read a source and swap in an updated index. Returns True if it changed."""
+
+        if source not in cls._stores:
+            # Not built yet, the first build will read fresh rows anyway
+            return False
+
+        rows = cls._readers[source](source)
+
+        with cls._locks[source]:
+            updated = cls._updated(source, cls._stores[source], rows)
+            if updated is None:
+                return False
+            cls._stores[source] = updated
+
+        print(f"Knowledge base {source} reloaded")
+        for listener in cls._reload_listeners:
+            listener(source)
+        return True
+
+    @classmethod
+    def warm_up(cls):
+        for source in list(cls._readers):
+            cls.get(source)
+
+    @classmethod
+    def sources(cls) -> list[str]:
+        return list(cls._readers)
+
+
+class KnowledgeBaseRefresher:
+    """Background task that periodically refreshes every registered knowledge base."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            for source in KnowledgeBaseRegistry.sources():
+                try:
+                    await loop.run_in_executor(None, KnowledgeBaseRegistry.refresh, source)
+                except Exception as e:
+                    print(f"Error refreshing knowledge base {source}: {e}")
@@ -0,0 +1,230 @@
+import fcntl
+import hashlib
+import os
+import pickle
+import shutil
+import time
+from contextlib import contextmanager
+from typing import Any, Iterable, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+VECTORS_FILE = "vectors.npy"
+NORMS_FILE = "norms.npy"
+DOCS_FILE = "docs.pkl"
+CURRENT_FILE = "CURRENT"
+MODEL_FILE = "MODEL"
+
+
+class MmapVectorStore(VectorStore):
+    """Read-only vector store whose vectors are memory-mapped from disk.
+
+    Every worker on a host that opens the same snapshot shares the page cache
+    instead of holding its own copy on the heap. Scores are squared L2
+    distances, matching the default FAISS index.
+
+    Snapshots are never changed in place: ``add_texts`` raises NotImplementedError and
+    updates go through ``SnapshotStore.refresh``, which publishes a new version.
+    ``apply_rows_diff`` only handles in-memory FAISS stores.
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        vectors: np.ndarray,
+        norms: np.ndarray,
+        ids: list[str],
+        documents: list[Document],
+    ):
+        self.embedding = embedding
+        self.vectors = vectors
+        self.norms = norms
+        self.ids = ids
+        self.documents = documents
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    @classmethod
+    def load(cls, directory: str, embedding: Embeddings) -> "MmapVectorStore":
+        vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+        norms = np.load(os.path.join(directory, NORMS_FILE), mmap_mode="r")
+        with open(os.path.join(directory, DOCS_FILE), "rb") as f:
+            ids, documents = pickle.load(f)
+        return cls(embedding, vectors, norms, ids, documents)
+
+    @staticmethod
+    def save(
+        directory: str,
+        vectors: list[list[float]],
+        ids: list[str],
+        documents: list[Document],
+    ):
+        os.makedirs(directory, exist_ok=True)
+        array = np.asarray(vectors, dtype=np.float32)
+        np.save(os.path.join(directory, VECTORS_FILE), array)
+        np.save(os.path.join(directory, NORMS_FILE), np.einsum("ij,ij->i", array, array))
+        with open(os.path.join(directory, DOCS_FILE), "wb") as f:
+            pickle.dump((ids, documents), f)
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: list[float], k: int = 4
+    ) -> list[tuple[Document, float]]:
+        if not self.ids:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        distances = self.norms - 2 * (self.vectors @ query) + query @ query
+
+        k = min(k, len(self.ids))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return [(self.documents[i], float(distances[i])) for i in top]
+
+    def similarity_search_by_vector(
+        self, embedding: list[float], k: int = 4, **kwargs: Any
+    ) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> list[tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> list[Document]:
+        return self.similarity_search_by_vector(self.embedding.embed_query(query), k)
+
+    def _select_relevance_score_fn(self):
+        return self._euclidean_relevance_score_fn
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[list[dict]] = None, **kwargs: Any) -> list[str]:
+        raise NotImplementedError("MmapVectorStore is read-only, publish a new snapshot instead")
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: Optional[list[dict]] = None,
+        *,
+        ids: Optional[list[str]] = None,
+        directory: Optional[str] = None,
+        **kwargs: Any,
+    ) -> "MmapVectorStore":
+        if directory is None:
+            raise ValueError("MmapVectorStore.from_texts requires a snapshot directory")
+
+        ids = ids or [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        documents = [
+            Document(id=id, page_content=text, metadata=metadata)
+            for id, text, metadata in zip(ids, texts, metadatas)
+        ]
+
+        cls.save(directory, embedding.embed_documents(texts), ids, documents)
+        return cls.load(directory, embedding)
+
+
+class SnapshotStore:
+    """Versioned MmapVectorStore snapshots for one knowledge source.
+
+    Versions are written to fresh directories and published by atomically
+    replacing the CURRENT pointer, so readers never see a partial snapshot.
+    A file lock makes sure only one worker on the host builds at a time.
+    Each version records the embedding model it was built with, and one built
+    with a different model is never loaded.
+    """
+
+    def __init__(self, root: str, source: str, model: str, keep_versions: int = 2):
+        self.directory = os.path.join(root, hashlib.sha256(source.encode("utf-8")).hexdigest()[:16])
+        self.model = model
+        self.keep_versions = keep_versions
+        os.makedirs(self.directory, exist_ok=True)
+
+    @contextmanager
+    def lock(self):
+        with open(os.path.join(self.directory, ".lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def current_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.directory, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load_current(self, embedding: Embeddings) -> Optional[MmapVectorStore]:
+        version = self.current_version()
+        if version is None:
+            return None
+        # Vectors from another embedding model can't be compared with our queries
+        if self.version_model(version) != self.model:
+            print(f"Snapshot {version} in {self.directory} was not built with {self.model}, rebuilding")
+            return None
+        return MmapVectorStore.load(os.path.join(self.directory, version), embedding)
+
+    def version_model(self, version: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.directory, version, MODEL_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def publish(self, rows: list[str], ids: list[str], embedding: Embeddings) -> MmapVectorStore:
+        version = f"v{time.time_ns()}"
+        store = MmapVectorStore.from_texts(
+            rows, embedding, ids=ids, directory=os.path.join(self.directory, version)
+        )
+        with open(os.path.join(self.directory, version, MODEL_FILE), "w") as f:
+            f.write(self.model)
+
+        pointer = os.path.join(self.directory, CURRENT_FILE)
+        with open(pointer + ".tmp", "w") as f:
+            f.write(version)
+        os.replace(pointer + ".tmp", pointer)
+
+        self._prune()
+        return store
+
+    def _prune(self):
+        versions = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith("v") and os.path.isdir(os.path.join(self.directory, name))
+        )
+        # Workers still mapping an old version keep their pages after unlink
+        for name in versions[: -self.keep_versions]:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def load_or_build(self, rows_reader, id_fn, embedding: Embeddings) -> MmapVectorStore:
+        store = self.load_current(embedding)
+        if store is not None:
+            return store
+
+        with self.lock():
+            store = self.load_current(embedding)
+            if store is not None:
+                return store
+
+            rows = rows_reader()
+            return self.publish(rows, [id_fn(row) for row in rows], embedding)
+
+    def refresh(self, store: MmapVectorStore, rows: list[str], id_fn, embedding: Embeddings) -> Optional[MmapVectorStore]:
+        ids = [id_fn(row) for row in rows]
+        if set(ids) == set(store.ids):
+            return None
+
+        with self.lock():
+            # Another worker may already have published this content
+            latest = self.load_current(embedding)
+            if latest is not None and set(latest.ids) == set(ids):
+                return latest
+            # Unchanged rows come out of the embedding cache, only new rows are embedded
+            return self.publish(rows, ids, embedding)
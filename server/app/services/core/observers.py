@@ -1,46 +1,92 @@
 from enum import Enum
-from typing import Any
+from typing import Any, NamedTuple, Optional
+import asyncio
+import time
+from app.utils.metrics import LatencyHistogram
+
+class DispatchMode(Enum):
+    # Awaited by the emitter, for hot audio events where order and latency matter
+    INLINE = "inline"
+    # Run in order on the observer's background task, the emitter doesn't wait
+    QUEUED = "queued"
+
+class ListenerStats:
+
+    def __init__(self, mode : DispatchMode):
+        self.mode = mode
+        self.latency = LatencyHistogram()
+        self.errors = 0
+
+    def snapshot(self) -> dict:
+        return {"mode": self.mode.value, "errors": self.errors, "latency": self.latency.snapshot()}
+
+# Per listener across all calls, keyed by event and function name
+LISTENER_STATS : dict[str, ListenerStats] = {}
+
+def listener_stats() -> dict:
+    return {name: stats.snapshot() for name, stats in LISTENER_STATS.items()}
+
+class Listener(NamedTuple):
+    func : callable
+    mode : DispatchMode
+    stats : ListenerStats
 
 class Observer:
 
     def __init__(self):
-        self.events_map : dict[Any, callable] = {}
+        self.events_map : dict[Any, list[Listener]] = {}
+        self._queue : asyncio.Queue[tuple[Listener, Any]] = asyncio.Queue()
+        self._worker : Optional[asyncio.Task] = None
 
-    def add_event_listener(self, event : Any, func : callable):
+    def add_event_listener(self, event : Any, func : callable, mode : DispatchMode = DispatchMode.INLINE):
         print(f"Adding event listener for {event}", "function", func)
-        self.events_map[event] = func
+        name = f"{getattr(event, 'name', event)}:{getattr(func, '__qualname__', repr(func))}"
+        stats = LISTENER_STATS.setdefault(name, ListenerStats(mode))
+        self.events_map.setdefault(event, []).append(Listener(func, mode, stats))
 
     async def on_event(self, event : Any, data : Any):
-        if event in self.events_map:
-            # print(f"Calling event listener for {event}", "function", self.events_map[event])
-            await self.events_map[event](data)
+        for listener in self.events_map.get(event, []):
+            if listener.mode == DispatchMode.INLINE:
+                await self._call(listener, data)
+            else:
+                self._queue.put_nowait((listener, data))
+                if self._worker is None or self._worker.done():
+                    self._worker = asyncio.create_task(self._run_queued())
+
+    async def _call(self, listener : Listener, data : Any):
+        started = time.perf_counter()
+        try:
+            await listener.func(data)
+        except Exception as e:
+            # One failing listener shouldn't keep the others from running
+            listener.stats.errors += 1
+            print(f"Error in event listener {listener.func}: ", e)
+        finally:
+            listener.stats.latency.observe(time.perf_counter() - started)
+
+    async def _run_queued(self):
+        while not self._queue.empty():
+            listener, data = self._queue.get_nowait()
+            await self._call(listener, data)
 
 class VoiceAgentEvent(Enum):
     AUDIO_GENERATED = "audio_generated"
     INTERRUPTED = "user_speaking"
-    
-class VoiceAgentObserver(Observer):
 
-    def __init__(self):
-        self.events_map : dict[VoiceAgentEvent, callable] = {}
+class VoiceAgentObserver(Observer):
 
-    def add_event_listener(self, event : VoiceAgentEvent, func : callable):
-        super().add_event_listener(event, func)
+    def add_event_listener(self, event : VoiceAgentEvent, func : callable, mode : DispatchMode = DispatchMode.INLINE):
+        super().add_event_listener(event, func, mode)
 
 class CallEvent(Enum):
     CALL_STARTED = "call_started"
     CALL_ENDED = "call_ended"
     AUDIO_CHUNK = "audio_chunk"
-    
+    PLAYBACK_UPDATED = "playback_updated"
 
 
-class CallObserver(Observer):
-
-    def __init__(self):
-        self.events_map : dict[CallEvent, callable] = {}
-
-    def add_event_listener(self, event : CallEvent, func : callable):
-        super().add_event_listener(event, func)
-
 
+class CallObserver(Observer):
 
+    def add_event_listener(self, event : CallEvent, func : callable, mode : DispatchMode = DispatchMode.INLINE):
+        super().add_event_listener(event, func, mode)
@@ -9,6 +9,8 @@ from langchain_core.documents import Document
 import json
 from typing import AsyncIterator
 from app.models.context import ConversationContext
+from app.services.core.chat_history import ChatHistoryManager
+from config import CHAT_HISTORY_TOKEN_BUDGET, CHAT_HISTORY_KEEP_TURNS, RESPONSE_STREAM_MODE
 
 class ChatMessageTypes(Enum):
     HUMAN = "human"
@@ -26,39 +28,59 @@ class ResponseEngine(CallElement):
         self.system_prompt = system_prompt
         self.leading_prompt = leading_prompt
 
+        self.bot_id = None
         self.prompt_template = None
+        self.llm = None
         self.retrieval_chain = None
         self.chat_history = rg.ChatMessageHistory()
+        # Prompt-sized view of chat_history, the full history is kept for the post-call transcript
+        self.history = ChatHistoryManager(
+            self.chat_history,
+            token_budget=CHAT_HISTORY_TOKEN_BUDGET,
+            keep_turns=CHAT_HISTORY_KEEP_TURNS,
+        )
         
 
     def add_to_chat_history(self, message : str, role : ChatMessageTypes):
         
         if role == ChatMessageTypes.HUMAN:  
-            self.chat_history.add_user_message(message)
+            self.history.add_user_message(message)
         elif role == ChatMessageTypes.AI:
-            self.chat_history.add_ai_message(message)
+            self.history.add_ai_message(message)
 
     def initialize_defaults(self):
-        self.prompt_template = rg.get_prompt_template(
+        # Shared by every call to this bot, the vector store is passed per invocation
+        compiled = rg.get_compiled_chain(
+            bot_id=self.bot_id,
             sys_prompt=self.system_prompt,
-            leading_prompt=self.leading_prompt
-        )
-        self.retrieval_chain = rg.get_default_retrieval_chain(
-            vector_store=self.vector_store,
-            prompt_template=self.prompt_template
+            leading_prompt=self.leading_prompt,
         )
+        self.prompt_template = compiled.prompt_template
+        self.llm = compiled.llm
+        self.retrieval_chain = compiled.chain
 
-        print("Retrieval chain: ", self.retrieval_chain)
-        print("Prompt template: ", self.prompt_template)
-
-    async def create_response_gen(self, input, **kwargs) -> AsyncIterator[str]:
+    async def create_response_gen(self, input, commit_input : bool = True, **kwargs) -> AsyncIterator[str]:
         print("Creating response gen with input: ", input)
-        response_gen = rg.get_response_stream(
-            chain=self.retrieval_chain,
-            user_input=input,
-            chat_history=self.chat_history,
-            prompt_kwargs=kwargs
-        )
+        if RESPONSE_STREAM_MODE == "direct":
+            response_gen = rg.get_direct_response_stream(
+                prompt_template=self.prompt_template,
+                llm=self.llm,
+                vector_store=self.vector_store,
+                user_input=input,
+                chat_history=self.history,
+                prompt_kwargs=kwargs,
+                commit_input=commit_input,
+                bot_id=self.bot_id,
+            )
+        else:
+            response_gen = rg.get_response_stream(
+                chain=self.retrieval_chain,
+                user_input=input,
+                chat_history=self.history,
+                prompt_kwargs=kwargs,
+                commit_input=commit_input,
+                vector_store=self.vector_store,
+            )
 
         async for chunk in response_gen:
             yield chunk.response
@@ -66,6 +88,7 @@ class ResponseEngine(CallElement):
     # TODO: Add logic to load prompts from start data
     async def initialize_from_start_data(self, call_context : ConversationContext):
         
+        self.bot_id = call_context.bot.id
         self.vector_store = call_context.bot.knowledge_base
         self.system_prompt = call_context.bot.sys_prompt
         self.leading_prompt = call_context.bot.leading_prompt
@@ -3,22 +3,43 @@ from langchain_core.messages import (
     AIMessage,
     SystemMessage,
     AIMessageChunk,
+    BaseMessage,
 )
 from langchain_core.documents import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_community.vectorstores import FAISS
-from langchain_core.runnables import RunnablePassthrough, Runnable
+from langchain_community.docstore.in_memory import InMemoryDocstore
+import faiss
+from langchain_core.runnables import RunnablePassthrough, Runnable, RunnableLambda, RunnableConfig
+from langchain_core.language_models import BaseChatModel
+from langchain_core.vectorstores import VectorStore
 from langchain_openai import AzureOpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
 from typing import Optional, Union
 from langchain.memory import ChatMessageHistory
 import asyncio
 from typing import AsyncIterator, NamedTuple
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from app.services.ext.azure_ai import get_llm, get_embeddings
-from config import AzureModels
-import re
+from config import (
+    AzureModels,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_CACHE_MAX_ENTRIES,
+    RETRIEVAL_CACHE_MAX_ENTRIES,
+    RETRIEVAL_CACHE_TTL,
+    EMBEDDING_BATCH_MAX_SIZE,
+    EMBEDDING_BATCH_MAX_WAIT_MS,
+    TURN_CLASSIFIER_MODEL_PATH,
+)
 from app.utils.misc import read_gsheet
+from app.services.core.embedding_cache import EmbeddingCache, CachedEmbeddings
+from app.services.core.retrieval_cache import RetrievalCache
+from app.services.core.embedding_batcher import EmbeddingBatcher
+from app.services.core.segmenter import SentenceSegmenter, SegmenterConfig
+from app.services.core.turn_classifier import TurnClassifier, TurnType, load_turn_model
+import time
+import hashlib
 
 
 class AIStreamResponse(NamedTuple):
@@ -28,10 +49,27 @@ class AIStreamResponse(NamedTuple):
 
 DEFAULT_EMBEDDINGS = get_embeddings(AzureModels.ada_embeddings)
 
+# Document embeddings survive restarts so unchanged knowledge base rows are never re-embedded
+EMBEDDING_CACHE = EmbeddingCache(EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES)
+CACHED_EMBEDDINGS = CachedEmbeddings(
+    DEFAULT_EMBEDDINGS, EMBEDDING_CACHE, model=AzureModels.ada_embeddings.value
+)
+
+# Live calls embed their utterances through one coalescer to share Azure requests
+EMBEDDING_BATCHER = EmbeddingBatcher(
+    DEFAULT_EMBEDDINGS,
+    max_batch_size=EMBEDDING_BATCH_MAX_SIZE,
+    max_wait=EMBEDDING_BATCH_MAX_WAIT_MS / 1000,
+)
+
+RETRIEVAL_CACHE = RetrievalCache(max_entries=RETRIEVAL_CACHE_MAX_ENTRIES, ttl=RETRIEVAL_CACHE_TTL)
+
+TURN_CLASSIFIER = TurnClassifier(model=load_turn_model(TURN_CLASSIFIER_MODEL_PATH))
+
 
 def create_vector_store(
     documents: list[Document],
-    embeddings: AzureOpenAIEmbeddings = DEFAULT_EMBEDDINGS,
+    embeddings: Embeddings = CACHED_EMBEDDINGS,
     persist_directory: Optional[str] = None,
 ):
     """Create a FAISS vector store from documents."""
@@ -48,27 +86,124 @@ def create_vector_store(
     return vector_store
 
 
-def vector_store_from_gsheet(sheet_url: str) -> FAISS:
+def gsheet_rows(sheet_url: str) -> list[str]:
     df = read_gsheet(sheet_url)
-    documents = df.apply(
+    rows = df.apply(
         lambda row: "Situation: " + row.iloc[0] + "\Suggested Response: " + row.iloc[1],
         axis=1,
     ).tolist()
 
-    return FAISS.from_texts(documents, DEFAULT_EMBEDDINGS)
+    # Duplicate rows would collide on their content id
+    return list(dict.fromkeys(rows))
+
+
+def row_id(text: str) -> str:
+    return EmbeddingCache.text_hash(text)
+
+
+def vector_store_from_rows(rows: list[str]) -> FAISS:
+    vector_store = FAISS.from_texts(
+        rows, CACHED_EMBEDDINGS, ids=[row_id(row) for row in rows]
+    )
+    print("Embedding cache stats: ", EMBEDDING_CACHE.stats())
+    return vector_store
+
+
+def vector_store_from_gsheet(sheet_url: str) -> FAISS:
+    return vector_store_from_rows(gsheet_rows(sheet_url))
+
+
+def copy_vector_store(vector_store: FAISS) -> FAISS:
+    return FAISS(
+        embedding_function=vector_store.embedding_function,
+        index=faiss.clone_index(vector_store.index),
+        docstore=InMemoryDocstore(dict(vector_store.docstore._dict)),
+        index_to_docstore_id=dict(vector_store.index_to_docstore_id),
+    )
+
+
+def apply_rows_diff(vector_store: FAISS, rows: list[str]) -> Optional[FAISS]:
+    """Return a copy of the store updated to match rows, or None if nothing changed.
+
+    Only added rows are embedded. The given store is left untouched so readers
+    holding it keep a consistent view. Snapshot stores are refreshed through
+    SnapshotStore.refresh instead.
+    """
+    if not isinstance(vector_store, FAISS):
+        raise TypeError(f"apply_rows_diff needs a FAISS store, got {type(vector_store).__name__}")
+
+    current_ids = set(vector_store.index_to_docstore_id.values())
+    new_rows = {row_id(row): row for row in rows}
+
+    removed_ids = list(current_ids - new_rows.keys())
+    added_ids = [id for id in new_rows if id not in current_ids]
+
+    if not removed_ids and not added_ids:
+        return None
+
+    print(f"Knowledge base diff: {len(added_ids)} added, {len(removed_ids)} removed")
+
+    updated = copy_vector_store(vector_store)
+    if removed_ids:
+        updated.delete(removed_ids)
+    if added_ids:
+        updated.add_texts([new_rows[id] for id in added_ids], ids=added_ids)
+
+    return updated
 
 
 def load_vector_store(persist_directory: str):
     return FAISS.load_local(persist_directory, DEFAULT_EMBEDDINGS)
 
 
+async def retrieve_documents(
+    vector_store: VectorStore,
+    query: str,
+    bot_id: Optional[str] = None,
+    k: int = 3,
+) -> list[Document]:
+    """Search the knowledge base, serving repeated utterances from RETRIEVAL_CACHE."""
+
+    if bot_id is not None:
+        documents = RETRIEVAL_CACHE.get(bot_id, query, vector_store)
+        if documents is not None:
+            return documents
+
+    start = time.perf_counter()
+    embedding = await EMBEDDING_BATCHER.aembed_query(query)
+    documents = await vector_store.asimilarity_search_by_vector(embedding, k=k)
+
+    if bot_id is not None:
+        RETRIEVAL_CACHE.put(bot_id, query, documents, time.perf_counter() - start, vector_store)
+
+    return documents
+
+
+async def retrieve_turn_context(
+    vector_store: VectorStore,
+    query: str,
+    bot_id: Optional[str] = None,
+) -> list[Document]:
+    """Context documents for a turn, or none for backchannel turns like "okay, thanks"."""
+
+    if TURN_CLASSIFIER.classify(query) is TurnType.TRIVIAL:
+        return []
+    return await retrieve_documents(vector_store, query, bot_id=bot_id)
+
+
 def get_default_retrieval_chain(
-    vector_store: FAISS,
+    vector_store: Optional[VectorStore],
     prompt_template: ChatPromptTemplate,
     model: AzureModels = AzureModels.gpt_4o,
+    bot_id: Optional[str] = None,
+    llm: Optional[BaseChatModel] = None,
 ):
-    """Create a conversational retrieval chain."""
-    llm = get_llm(model)
+    """Create a conversational retrieval chain.
+
+    Without a vector_store the chain searches the one passed per invocation in
+    config["configurable"]["vector_store"], so a single chain can serve many calls.
+    """
+    llm = llm or get_llm(model)
 
     # Create document chain for question answering
     document_chain = create_stuff_documents_chain(llm, prompt_template)
@@ -77,10 +212,16 @@ def get_default_retrieval_chain(
         # Grab the last user message, pass it to retriever
         return params["messages"][-1].content
 
+    async def retrieve(params: dict, config: RunnableConfig):
+        return await retrieve_turn_context(
+            vector_store or config["configurable"]["vector_store"],
+            parse_retriever_input(params),
+            bot_id=bot_id,
+        )
+
     # Create retrieval chain using RunnablePassthrough
     retrieval_chain = RunnablePassthrough.assign(
-        context=parse_retriever_input
-        | vector_store.as_retriever(search_kwargs={"k": 3})
+        context=RunnableLambda(retrieve)
     ).assign(
         answer=document_chain,
     )
@@ -88,6 +229,47 @@ def get_default_retrieval_chain(
     return retrieval_chain
 
 
+class CompiledChain(NamedTuple):
+    prompt_template: ChatPromptTemplate
+    llm: BaseChatModel
+    chain: Runnable
+
+
+_COMPILED_CHAINS: dict[tuple[Optional[str], str, AzureModels], CompiledChain] = {}
+
+
+def prompt_version(sys_prompt: str, leading_prompt: str = "") -> str:
+    return hashlib.sha256(f"{sys_prompt}\0{leading_prompt}".encode("utf-8")).hexdigest()[:16]
+
+
+def get_compiled_chain(
+    bot_id: Optional[str],
+    sys_prompt: str,
+    leading_prompt: str = "",
+    model: AzureModels = AzureModels.gpt_4o,
+) -> CompiledChain:
+    """Prompt template, LLM client and retrieval chain, built once per (bot, prompt version, model).
+
+    Per-call state (chat history, prompt kwargs, vector store) is passed at invocation.
+    """
+    key = (bot_id, prompt_version(sys_prompt, leading_prompt), model)
+    compiled = _COMPILED_CHAINS.get(key)
+
+    if compiled is None:
+        prompt_template = get_prompt_template(sys_prompt, leading_prompt)
+        llm = get_llm(model)
+        chain = get_default_retrieval_chain(
+            vector_store=None,
+            prompt_template=prompt_template,
+            model=model,
+            bot_id=bot_id,
+            llm=llm,
+        )
+        compiled = _COMPILED_CHAINS[key] = CompiledChain(prompt_template, llm, chain)
+
+    return compiled
+
+
 async def get_complete_response(
     chain: Runnable,
     user_input: str,
@@ -107,10 +289,12 @@ async def get_response_stream(
     user_input: str,
     chat_history: ChatMessageHistory = ChatMessageHistory(),
     prompt_kwargs: dict = None,
+    commit_input: bool = True,
+    vector_store: Optional[VectorStore] = None,
 ) -> AsyncIterator[AIStreamResponse]:
 
     async for chunk in await _get_retrieval_response(
-        chain, user_input, chat_history, prompt_kwargs
+        chain, user_input, chat_history, prompt_kwargs, commit_input, vector_store
     ):
 
         event = chunk.get("event")
@@ -125,19 +309,73 @@ async def get_response_stream(
                 )
 
 
+async def get_direct_response_stream(
+    prompt_template: ChatPromptTemplate,
+    llm: BaseChatModel,
+    vector_store: VectorStore,
+    user_input: str,
+    chat_history: ChatMessageHistory = ChatMessageHistory(),
+    prompt_kwargs: dict = None,
+    commit_input: bool = True,
+    bot_id: Optional[str] = None,
+) -> AsyncIterator[AIStreamResponse]:
+    """Same output as get_response_stream without going through astream_events.
+
+    Retrieval runs explicitly, the prompt is rendered once and tokens come straight
+    from the chat model, so no intermediate runnable events are built per token.
+    """
+    messages = _prepare_messages(user_input, chat_history, commit_input)
+    documents = await retrieve_turn_context(vector_store, user_input, bot_id=bot_id)
+
+    prompt_messages = prompt_template.format_messages(
+        **(prompt_kwargs or {}),
+        messages=messages,
+        context=format_documents(documents),
+    )
+
+    async for chunk in llm.astream(prompt_messages):
+        finish_reason = chunk.response_metadata.get("finish_reason")
+        yield AIStreamResponse(response=chunk.content, finished=finish_reason is not None)
+
+
+def format_documents(documents: list[Document]) -> str:
+    # Matches the default document prompt and separator of create_stuff_documents_chain
+    return "\n\n".join(document.page_content for document in documents)
+
+
+def _prepare_messages(
+    user_input: str,
+    chat_history: ChatMessageHistory,
+    commit_input: bool = True,
+) -> list[BaseMessage]:
+    """Prompt messages for a turn.
+
+    With commit_input=False the user input is only appended to the prompt, leaving
+    the chat history untouched (used for speculative responses).
+    """
+    if commit_input:
+        chat_history.add_user_message(user_input)
+        return chat_history.messages
+    return chat_history.messages + [HumanMessage(content=user_input)]
+
+
 async def _get_retrieval_response(
     chain: Runnable,
     user_input: str,
     chat_history: ChatMessageHistory = ChatMessageHistory(),
     prompt_kwargs: dict = None,
+    commit_input: bool = True,
+    vector_store: Optional[VectorStore] = None,
 ) -> AsyncIterator[AIMessageChunk]:
     """Get response from the retrieval chain."""
-    chat_history.add_user_message(user_input)
+    messages = _prepare_messages(user_input, chat_history, commit_input)
+
     response = chain.astream_events(
         {
-            "messages": chat_history.messages,
+            "messages": messages,
         }
         | (prompt_kwargs or {}),
+        config={"configurable": {"vector_store": vector_store}} if vector_store else None,
         version="v2",
     )
     return response
@@ -160,51 +398,16 @@ def get_prompt_template(
 
 async def get_response_sentences(
     response_gen: AsyncIterator[AIStreamResponse],
+    config: SegmenterConfig = SegmenterConfig(),
 ) -> AsyncIterator[str]:
 
-    print("Getting response sentences")
-
-    try:
-        curr_sentence = ""
-        prev_sentence = ""
-
-        def get_sentence():
-            nonlocal curr_sentence
-            sentence = curr_sentence
-            curr_sentence = ""
-            return sentence
-
-        async for chunk in response_gen:
-            print("Chunk: ", chunk)
-            content = chunk.response
-            curr_sentence = prev_sentence + curr_sentence
-            prev_sentence = ""
-            if content:
-                curr_sentence += content
-
-            if (
-                len(curr_sentence) == 1 and re.search(r"[.!?]", curr_sentence)
-            ) or re.match(r"^-?\d+\./$", curr_sentence.strip()):
-                curr_sentence = ""
-                continue
-
-            split_sentence = curr_sentence.split()
-            if (
-                "\n" in content
-                or re.search(r"[.!?]", content)
-                or ("," in content and len(split_sentence) > 3)
-            ):
-                yield get_sentence()
-                continue
-
-            if len(split_sentence) > 14:
-                prev_sentence = " ".join(split_sentence[9:])
-                curr_sentence = " ".join(split_sentence[0:9]) + " "
-                yield get_sentence()
-                continue
-
-    except Exception as e:
-        print("Error: ", e)
-        raise e
+    segmenter = SentenceSegmenter(config)
 
+    async for chunk in response_gen:
+        if chunk.response:
+            for sentence in segmenter.feed(chunk.response):
+                yield sentence
 
+    remainder = segmenter.flush()
+    if remainder:
+        yield remainder
@@ -0,0 +1,75 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Optional
+from langchain_core.documents import Document
+from app.utils.misc import normalize_utterance
+
+
+class RetrievalCache:
+    """LRU + TTL cache of retrieved documents keyed by (bot id, normalized utterance).
+
+    A hit skips both the query embedding round trip and the vector search. Entries remember the
+    vector store they came from and only hit for that store, so a search that finishes on a
+    store replaced by a reload can't serve its documents afterwards.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.saved_latency = 0.0
+        self._miss_latency = 0.0
+        self._entries: OrderedDict[tuple[str, str], tuple[float, list[Document], Optional[weakref.ref]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, bot_id: str, utterance: str, store: Optional[object] = None) -> Optional[list[Document]]:
+        key = (bot_id, normalize_utterance(utterance))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl and self._same_store(entry[2], store):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                # Each hit saves roughly what an average miss costs
+                self.saved_latency += self._miss_latency / max(self.misses, 1)
+                return entry[1]
+
+            if entry is not None:
+                del self._entries[key]
+            return None
+
+    @staticmethod
+    def _same_store(store_ref: Optional[weakref.ref], store: Optional[object]) -> bool:
+        if store_ref is None or store is None:
+            return store_ref is None and store is None
+        return store_ref() is store
+
+    def put(self, bot_id: str, utterance: str, documents: list[Document], latency: float, store: Optional[object] = None):
+        key = (bot_id, normalize_utterance(utterance))
+        with self._lock:
+            self.misses += 1
+            self._miss_latency += latency
+            self._entries[key] = (time.monotonic(), documents, weakref.ref(store) if store is not None else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, bot_id: Optional[str] = None):
+        with self._lock:
+            if bot_id is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == bot_id]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "saved_latency_s": self.saved_latency,
+        }
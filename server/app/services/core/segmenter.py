@@ -0,0 +1,113 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+DEFAULT_ABBREVIATIONS = frozenset({
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e",
+    "a.m", "p.m", "approx", "est", "dept", "fig", "inc", "ltd", "co", "mt", "ave",
+})
+
+_TERMINATORS = ".!?"
+_CLOSERS = "\"')]”’"
+
+
+@dataclass(frozen=True)
+class SegmenterConfig:
+    """When a streamed response is cut into a segment for TTS, in words.
+
+    The first_* values apply to the first segment of a turn so audio starts early.
+    """
+
+    max_words: int = 15
+    first_max_words: int = 8
+    comma_min_words: int = 6
+    first_comma_min_words: int = 3
+    abbreviations: frozenset = field(default=DEFAULT_ABBREVIATIONS)
+
+
+class SentenceSegmenter:
+    """Incremental sentence segmenter for streamed LLM tokens.
+
+    Each feed only scans the newly arrived characters. A sentence terminator only
+    ends a segment once the following character is whitespace, which keeps
+    decimals ("3.5"), abbreviations ("Dr. Smith") and list markers ("1. Walk")
+    in one piece.
+    """
+
+    def __init__(self, config: SegmenterConfig = SegmenterConfig()):
+        self.config = config
+        self.emitted = 0
+        self._parts: list[str] = []
+        self._word: list[str] = []
+        self._last_word = ""
+        self._words = 0
+        self._pending: Optional[str] = None
+
+    def feed(self, text: str) -> list[str]:
+        segments = []
+
+        for char in text:
+            if char.isspace():
+                self._end_word()
+                if self._should_break(char):
+                    segment = self._emit()
+                    if segment:
+                        segments.append(segment)
+                    continue
+                self._pending = None
+                if self._parts:
+                    self._parts.append(char)
+                continue
+
+            if char in _TERMINATORS or char == ",":
+                self._pending = char
+            elif char not in _CLOSERS:
+                self._pending = None
+
+            self._parts.append(char)
+            self._word.append(char)
+
+        return segments
+
+    def flush(self) -> str:
+        self._end_word()
+        return self._emit()
+
+    def _end_word(self):
+        if self._word:
+            self._words += 1
+            self._last_word = "".join(self._word)
+            self._word = []
+
+    def _should_break(self, char: str) -> bool:
+        first = self.emitted == 0
+        pending = self._pending
+
+        if char == "\n" and self._words and not self._is_list_marker():
+            return True
+        if pending == "!" or pending == "?":
+            return True
+        if pending == ".":
+            return not self._is_abbreviation() and not self._is_list_marker()
+        if pending == ",":
+            return self._words >= (self.config.first_comma_min_words if first else self.config.comma_min_words)
+        return self._words >= (self.config.first_max_words if first else self.config.max_words)
+
+    def _core_word(self) -> str:
+        return self._last_word.strip(_CLOSERS).rstrip(_TERMINATORS).lower()
+
+    def _is_abbreviation(self) -> bool:
+        word = self._core_word()
+        # Single letters are initials, except the pronoun
+        return word in self.config.abbreviations or (len(word) == 1 and word.isalpha() and word != "i")
+
+    def _is_list_marker(self) -> bool:
+        return self._words == 1 and self._core_word().rstrip(")").isdigit()
+
+    def _emit(self) -> str:
+        segment = "".join(self._parts).strip()
+        self._parts = []
+        self._words = 0
+        self._pending = None
+        if segment:
+            self.emitted += 1
+        return segment
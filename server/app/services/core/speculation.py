@@ -0,0 +1,56 @@
+import asyncio
+from typing import AsyncIterator, Optional
+from app.utils.misc import normalize_utterance
+
+
+SPECULATION_STATS = {"started": 0, "committed": 0, "discarded": 0}
+
+
+class SpeculativeResponse:
+    """Generates a response for an interim transcript in the background.
+
+    Tokens are buffered until the response is either committed, at which point
+    ``stream`` replays the buffer and continues live, or cancelled.
+    """
+
+    def __init__(self, transcript: str, response_gen: AsyncIterator[str]):
+        self.transcript = transcript
+        self.error: Optional[BaseException] = None
+        self._queue: asyncio.Queue[Optional[str]] = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(response_gen))
+        SPECULATION_STATS["started"] += 1
+
+    async def _run(self, response_gen: AsyncIterator[str]):
+        try:
+            async for text in response_gen:
+                self._queue.put_nowait(text)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self._queue.put_nowait(None)
+
+    def matches(self, transcript: str) -> bool:
+        return normalize_utterance(transcript) == normalize_utterance(self.transcript)
+
+    def commit(self) -> AsyncIterator[str]:
+        SPECULATION_STATS["committed"] += 1
+        return self._stream()
+
+    async def _stream(self) -> AsyncIterator[str]:
+        while True:
+            text = await self._queue.get()
+            if text is None:
+                if self.error is not None:
+                    raise self.error
+                return
+            yield text
+
+    def cancel(self):
+        SPECULATION_STATS["discarded"] += 1
+        self.stop()
+
+    def stop(self):
+        if not self._task.done():
+            self._task.cancel()
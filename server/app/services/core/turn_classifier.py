@@ -0,0 +1,88 @@
+import os
+import pickle
+import re
+from enum import Enum
+from typing import Callable, Optional
+from app.utils.misc import normalize_utterance
+
+
+class TurnType(Enum):
+    TRIVIAL = "trivial"
+    SUBSTANTIVE = "substantive"
+
+
+# Single tokens that are only ever acknowledgements, thanks, goodbyes or fillers. Ordinary words
+# ("i", "do", "that", ...) must stay out, "I will do that" is an answer and needs retrieval.
+BACKCHANNEL_WORDS = {
+    "yes", "yeah", "yep", "yup", "ya", "ok", "okay", "k", "sure", "alright", "right",
+    "cool", "great", "nice", "awesome", "perfect", "fine", "good", "thanks", "thx",
+    "bye", "goodbye", "later", "cya", "cheers", "mhm", "hmm", "uh", "um", "huh",
+    "ah", "oh", "gotcha",
+}
+
+# Multi-word courtesy forms, matched anywhere in the utterance so "okay thank you" is trivial too
+BACKCHANNEL_PHRASES = {
+    "thank you", "thank you so much", "thank you very much", "thanks a lot", "thanks so much",
+    "sounds good", "got it", "see you", "see you later", "see ya", "talk to you later",
+    "have a good day", "have a good one", "that's it", "that's all", "i'm good", "all good",
+    "no problem", "no worries", "oh well",
+}
+
+_BACKCHANNEL_PHRASE = re.compile(
+    r"\b(?:" + "|".join(re.escape(phrase) for phrase in sorted(BACKCHANNEL_PHRASES, key=len, reverse=True)) + r")\b"
+)
+
+
+class TurnClassifier:
+    """Local rules, plus an optional offline model, that spot turns retrieval can't help with."""
+
+    def __init__(
+        self,
+        model: Optional[Callable[[str], float]] = None,
+        threshold: float = 0.5,
+        max_trivial_words: int = 5,
+    ):
+        self.model = model
+        self.threshold = threshold
+        self.max_trivial_words = max_trivial_words
+        self.counts = {turn_type.value: 0 for turn_type in TurnType}
+
+    def _classify(self, utterance: str) -> TurnType:
+        normalized = normalize_utterance(utterance)
+        words = normalized.split()
+
+        if not words:
+            return TurnType.TRIVIAL
+
+        # Whatever is left once the courtesy phrases are taken out must be backchannel tokens only
+        remaining = _BACKCHANNEL_PHRASE.sub(" ", normalized).split()
+        if all(word in BACKCHANNEL_WORDS for word in remaining):
+            return TurnType.TRIVIAL
+
+        if len(words) > self.max_trivial_words:
+            return TurnType.SUBSTANTIVE
+
+        if self.model is not None and self.model(normalized) >= self.threshold:
+            return TurnType.TRIVIAL
+
+        return TurnType.SUBSTANTIVE
+
+    def classify(self, utterance: str) -> TurnType:
+        turn_type = self._classify(utterance)
+        self.counts[turn_type.value] += 1
+        return turn_type
+
+    def stats(self) -> dict:
+        return dict(self.counts)
+
+
+def load_turn_model(path: Optional[str]) -> Optional[Callable[[str], float]]:
+    """Load a pickled scikit-learn text pipeline returning P(trivial) from predict_proba."""
+
+    if not path or not os.path.exists(path):
+        return None
+
+    with open(path, "rb") as f:
+        pipeline = pickle.load(f)
+
+    return lambda utterance: float(pipeline.predict_proba([utterance])[0][1])
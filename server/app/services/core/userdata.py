@@ -3,7 +3,9 @@ from app.services.ext.supabase_client import *
 from app.models.user import User
 from typing import Iterator
 from app.services.ext.firebase_db import get_long_term_goal_descriptions
+from app.services.ext import firebase_async
 from app.models.activities import LongTermGoal, Habit
+import asyncio
 
 
 class UserDataService:
@@ -16,6 +18,15 @@ class UserDataService:
     def load_data_from_id(self, id : str) -> None:
 
         user_data = supabase.from_('users').select('*').eq('id', id).execute()
+        self._set_user_data(id, user_data)
+
+    async def aload_data_from_id(self, id : str) -> None:
+        # The supabase client is sync only, keep its HTTP round trip off the event loop
+        loop = asyncio.get_running_loop()
+        user_data = await loop.run_in_executor(None, supabase.from_('users').select('*').eq('id', id).execute)
+        self._set_user_data(id, user_data)
+
+    def _set_user_data(self, id : str, user_data) -> None:
         if user_data.data:
             self.data.id = user_data.data[0].get("id")
             self.data.first_name = user_data.data[0].get("first_name")
@@ -44,6 +55,17 @@ class UserDataService:
             print(f"Error fetching habits for user {self.data.id}: {e}")
             self.habits = []
 
+    async def afetch_goals_and_habits(self):
+        # Goals and habits live on the same document, read it once
+        try:
+            user_goals = await firebase_async.get_user_goals(self.data.id)
+        except Exception as e:
+            print(f"Error fetching goals and habits for user {self.data.id}: {e}")
+            user_goals = {}
+
+        self.long_term_goals = [LongTermGoal(name=goal) for goal in user_goals.get("long_term_goals", [])]
+        self.habits = [Habit(name=habit.get("name"), description=habit.get("description", "")) for habit in user_goals.get("habits", [])]
+
     def get_goals_string(self):
 
         if not self.long_term_goals:
@@ -6,13 +6,33 @@ from app.services.definitions.transcriptions import (
     TranscriptionService,
 )
 from app.services.definitions.voiceinterface import StreamingVoiceInterface
-from app.utils.misc import remove_trailing_punctuation
+from app.utils.misc import remove_trailing_punctuation, normalize_utterance
 import json
-from app.utils.audio import AudioConverter
+from app.utils.audio import AudioConverter, AudioPayload, PlaybackPosition
+from app.services.core.speculation import SpeculativeResponse
+from app.services.core.segmenter import SentenceSegmenter, SegmenterConfig
+from app.services.core.flush_controller import FlushController
+from app.utils.metrics import LatencyHistogram
+from config import SPECULATION_ENABLED, SPECULATION_STABLE_MS
 import asyncio
-import base64
 import re
-from typing import Any
+import time
+from typing import Any, AsyncIterator, Optional
+
+
+BARGE_IN_STATS = {
+    "interruptions": 0,
+    # Work already done for responses the caller talked over
+    "tokens_streamed": 0,
+    "chars_sent": 0,
+    # Text generated but never sent to TTS because the turn was cancelled
+    "chars_unsent": 0,
+    "cancel_latency": LatencyHistogram(),
+}
+
+
+def barge_in_stats() -> dict:
+    return {**BARGE_IN_STATS, "cancel_latency": BARGE_IN_STATS["cancel_latency"].snapshot()}
 
 
 class VoiceAgent:
@@ -35,6 +55,14 @@ class VoiceAgent:
         self.observers: list[VoiceAgentObserver] = observers
         self.audio_converter = audio_converter  
 
+        self.speculation : Optional[SpeculativeResponse] = None
+        self.speculation_timer : Optional[asyncio.TimerHandle] = None
+        self.speculation_timer_transcript = ""
+        self.flush_controller = FlushController()
+        self.response_task : Optional[asyncio.Task] = None
+        # What the caller has actually heard, only tracked when outbound audio is paced
+        self.playback = PlaybackPosition()
+
     async def notify_observers(self, event: VoiceAgentEvent, data: Any):
         for observer in self.observers:
             await observer.on_event(event, data)
@@ -45,10 +73,18 @@ class VoiceAgent:
 
 
         async def on_audio_generated(audio_b64: str):
-            await self.notify_observers(VoiceAgentEvent.AUDIO_GENERATED, base64.b64decode(audio_b64))
+            self.flush_controller.on_audio()
+            await self.notify_observers(VoiceAgentEvent.AUDIO_GENERATED, AudioPayload(audio_b64))
 
         self.voice_interface.on_audiogen_response_received(on_audio_generated)
 
+    async def on_playback_updated(self, position : PlaybackPosition):
+        self.playback = position
+
+    @property
+    def audio_playing(self) -> bool:
+        return self.playback.pending_ms > 0
+
     def should_enable_user_speech(self, transcript: str) -> bool:
 
         transcript = transcript.strip()
@@ -102,72 +138,182 @@ class VoiceAgent:
 
         if self.should_enable_user_speech(transcript):
 
-            if self.voice_context.agent_speaking:
-                self.voice_interface.set_ignore_incoming_audio(True)
-                self.voice_interface.force_flush()
-                self.voice_context.interruption = True
-                await self.notify_observers(VoiceAgentEvent.INTERRUPTED, True)
+            if (self.voice_context.agent_speaking or self.audio_playing) and not self.voice_context.interruption:
+                await self.interrupt()
 
             if speech_ended:
                 print("Speech ended")
                 print("Current transcript: ", self.voice_context.current_transcript)
+                await self.cancel_response()
                 self.voice_context.interruption = False
                 self.voice_interface.set_ignore_incoming_audio(False)
                 self.voice_context.agent_speaking = True
-                await self.generate_response(self.voice_context.current_transcript)
+                self.response_task = asyncio.create_task(
+                    self.respond(self.voice_context.current_transcript)
+                )
+
+            elif SPECULATION_ENABLED:
+                self.schedule_speculation(self.voice_context.current_transcript)
+
+    async def interrupt(self):
+        # Stop the LLM stream, drop pending synthesis and clear Twilio playback together
+        started = time.perf_counter()
+        self.voice_context.interruption = True
+        self.voice_interface.set_ignore_incoming_audio(True)
+        self.flush_controller.on_interrupt()
+
+        await asyncio.gather(
+            self.notify_observers(VoiceAgentEvent.INTERRUPTED, True),
+            self.cancel_response(),
+            self.voice_interface.reset(),
+        )
+
+        BARGE_IN_STATS["interruptions"] += 1
+        BARGE_IN_STATS["cancel_latency"].observe(time.perf_counter() - started)
+
+    async def cancel_response(self):
+        task, self.response_task = self.response_task, None
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def schedule_speculation(self, transcript: str):
+        # Speculate once the interim transcript has stopped changing for a while
+
+        if self.speculation is not None:
+            if self.speculation.matches(transcript):
+                return
+            self.speculation.cancel()
+            self.speculation = None
+
+        if self.speculation_timer is not None:
+            if normalize_utterance(transcript) == normalize_utterance(self.speculation_timer_transcript):
+                return
+            self.speculation_timer.cancel()
+
+        self.speculation_timer_transcript = transcript
+        self.speculation_timer = asyncio.get_running_loop().call_later(
+            SPECULATION_STABLE_MS / 1000, self.start_speculation, transcript
+        )
+
+    def start_speculation(self, transcript: str):
+        self.speculation_timer = None
+
+        # The prompt would miss the agent's in-progress turn
+        if self.voice_context.agent_speaking or not transcript:
+            return
+
+        print("Speculating on: ", transcript)
+        self.speculation = SpeculativeResponse(
+            transcript,
+            self.response_engine.create_response_gen(
+                transcript,
+                commit_input=False,
+                **{"state" : self.voice_context.call_state, **self.voice_context.const_keyword_args}
+            ),
+        )
+
+    async def respond(self, transcript: str):
+        try:
+            await self._respond(transcript)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print("Error generating response: ", e)
+            self.voice_context.agent_speaking = False
+
+    async def _respond(self, transcript: str):
+
+        if self.speculation_timer is not None:
+            self.speculation_timer.cancel()
+            self.speculation_timer = None
+
+        speculation, self.speculation = self.speculation, None
+
+        if speculation is None or not speculation.matches(transcript):
+            if speculation is not None:
+                speculation.cancel()
+            await self.generate_response(transcript)
+            return
+
+        print("Committing speculative response")
+        self.response_engine.add_to_chat_history(transcript, ChatMessageTypes.HUMAN)
+        try:
+            await self.generate_response(transcript, response_gen=speculation.commit(), replayed=True)
+        finally:
+            speculation.stop()
 
             
         
-    async def generate_response(self, input: str):
+    async def generate_response(self, input: str, response_gen : Optional[AsyncIterator[str]] = None, replayed : bool = False):
 
         if not input:
             return
 
-        response_gen = self.response_engine.create_response_gen(
-            input,
-            **{"state" : self.voice_context.call_state, **self.voice_context.const_keyword_args}
-        )
+        if response_gen is None:
+            response_gen = self.response_engine.create_response_gen(
+                input,
+                **{"state" : self.voice_context.call_state, **self.voice_context.const_keyword_args}
+            )
         agent_response = ""
 
-        FLUSH_THRESHOLD_WITH_COMMA = 8
-        FLUSH_FIRST_STREAM_THRESHOLD_WITH_COMMA = 4
-        FLUSH_THRESHOLD = 20
-        FLUSH_FIRST_STREAM_THRESHOLD = 10
+        # Single TTS flush policy: every completed segment is sent and flushed,
+        # with segment sizes tuned per turn from this call's measured latencies
+        self.flush_controller.call_id = self.voice_context.call_id
+        segmenter = SentenceSegmenter(self.flush_controller.start_turn(self.get_segmenter_config(), replayed=replayed))
 
-        response_to_be_flushed = []
-        first_stream_temp = True
+        tokens = 0
+        chars_sent = 0
 
-        async for text in response_gen:
+        try:
+            async for text in response_gen:
 
-            if not text:
-                continue
+                if not text:
+                    continue
 
+                if self.voice_context.interruption:
+                    print("Interruption detected")
+                    break
 
+                agent_response += text
+                tokens += 1
+                self.flush_controller.on_token(text)
 
-            if self.voice_context.interruption:
-                print("Interruption detected")
-                break
+                for segment in segmenter.feed(text):
+                    self.flush_controller.on_flush()
+                    await self.voice_interface.send_audio_request(segment, flush = True)
+                    chars_sent += len(segment)
 
-            response_to_be_flushed.append(text)
-            agent_response += text
+            remainder = segmenter.flush()
+            if remainder and not self.voice_context.interruption:
+                self.flush_controller.on_flush()
+                await self.voice_interface.send_audio_request(remainder, flush = True)
+                chars_sent += len(remainder)
 
-            if (any(char in text for char in ['.', '?', '!']) 
-                        or ',' in text and len(response_to_be_flushed) >= FLUSH_THRESHOLD_WITH_COMMA
-                        or ',' in text and first_stream_temp and len(response_to_be_flushed) >= FLUSH_FIRST_STREAM_THRESHOLD_WITH_COMMA
-                        or len(response_to_be_flushed) >= FLUSH_THRESHOLD
-                        or first_stream_temp and len(response_to_be_flushed) >= FLUSH_FIRST_STREAM_THRESHOLD):
-            
-                await self.voice_interface.send_audio_request(text, flush = True)
-                first_stream_temp = False
-                response_to_be_flushed = []
+        finally:
+            # Closes the LLM stream when the turn ended early
+            await response_gen.aclose()
+
+            if self.voice_context.interruption:
+                BARGE_IN_STATS["tokens_streamed"] += tokens
+                BARGE_IN_STATS["chars_sent"] += chars_sent
+                BARGE_IN_STATS["chars_unsent"] += max(len(agent_response.strip()) - chars_sent, 0)
+
+            self.flush_controller.end_turn()
 
-            else:
-                await self.voice_interface.send_audio_request(text, flush = False)
+            print("Agent response: ", agent_response)
 
-        print("Agent response: ", agent_response)
+            self.voice_context.agent_speaking = False
+            self.response_engine.add_to_chat_history(agent_response, ChatMessageTypes.AI)
 
-        self.voice_context.agent_speaking = False
-        self.response_engine.add_to_chat_history(agent_response, ChatMessageTypes.AI)
+    def get_segmenter_config(self) -> SegmenterConfig:
+        if self.voice_context.bot is not None:
+            return self.voice_context.bot.segmenter_config
+        return SegmenterConfig()
 
     async def put_raw_audio(self, audio_bytes: bytes):
         await self.stt_service.send_audio(audio_bytes)
@@ -177,5 +323,11 @@ class VoiceAgent:
         await asyncio.gather(self.stt_service.start_connection(), self.voice_interface.start_connection())
 
     async def stop(self, message : str):
+        await self.cancel_response()
+        if self.speculation_timer is not None:
+            self.speculation_timer.cancel()
+        if self.speculation is not None:
+            self.speculation.stop()
+        await self.response_engine.history.close()
         await self.stt_service.stop_connection()
         await self.voice_interface.stop_connection()
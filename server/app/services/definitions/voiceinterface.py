@@ -27,4 +27,9 @@ class StreamingVoiceInterface(CallElement, ABC):
 
     @abstractmethod
     async def force_flush(self, *args):
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    async def reset(self) -> None:
+        """Drop any text queued for synthesis."""
+        pass
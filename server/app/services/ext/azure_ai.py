@@ -1,30 +1,160 @@
 
-from config import AzureModels, AZURE_MODELS
+from config import (
+    AzureModels,
+    AZURE_MODELS,
+    LLM_HTTP_MAX_CONNECTIONS,
+    LLM_HTTP_MAX_KEEPALIVE,
+    LLM_HTTP_KEEPALIVE_EXPIRY,
+    LLM_HTTP2,
+)
 import json
 import requests
+import httpx
+import asyncio
+import threading
+import weakref
+from typing import Optional
 from langchain_openai import AzureChatOpenAI
 from langchain_openai import AzureOpenAIEmbeddings
 
+# One pool of keep-alive connections per process, shared by every Azure client
+_HTTP_LIMITS = httpx.Limits(
+    max_connections=LLM_HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+    keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY,
+)
+_HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+_llm_clients: dict[AzureModels, AzureChatOpenAI] = {}
+_embedding_clients: dict[AzureModels, AzureOpenAIEmbeddings] = {}
+_clients_lock = threading.Lock()
+
+
+def _http2_enabled() -> bool:
+    if not LLM_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_http_client() -> httpx.Client:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.Client(limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT, http2=_http2_enabled())
+    return _http_client
+
+
+class PerLoopTransport(httpx.AsyncBaseTransport):
+    """Async transport keeping one connection pool per running event loop.
+
+    Pooled connections belong to the loop that opened them, so a single pool breaks as soon as
+    a second loop (asyncio.run in a script or a worker) uses the shared clients.
+    """
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._transports: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport] = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def current(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                # Pools of finished loops can't be used again, drop them with their sockets
+                for closed in [other for other in self._transports if other.is_closed()]:
+                    del self._transports[closed]
+                transport = self._transports[loop] = httpx.AsyncHTTPTransport(**self._kwargs)
+            return transport
+
+    def transports(self) -> list[httpx.AsyncHTTPTransport]:
+        with self._lock:
+            return list(self._transports.values())
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.current().handle_async_request(request)
+
+    async def aclose(self):
+        with self._lock:
+            transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    global _async_http_client
+    if _async_http_client is None:
+        transport = PerLoopTransport(limits=_HTTP_LIMITS, http2=_http2_enabled())
+        _async_http_client = httpx.AsyncClient(transport=transport, timeout=_HTTP_TIMEOUT)
+    return _async_http_client
+
 
 def get_azure_model_data(model: AzureModels):
     return AZURE_MODELS[model]
 
 def get_llm(model: AzureModels):
-    azure_model_data = get_azure_model_data(model)
-    return AzureChatOpenAI(
-        azure_endpoint=azure_model_data.endpoint,
-        api_key=azure_model_data.api_key,
-        api_version=azure_model_data.api_version,
-        azure_deployment=model.value,
-        streaming=True
+    """Long-lived chat client for the model, reusing the shared connection pool.
 
-    )
+    Shared by every caller in the process, don't set attributes on it. Use ``.bind()`` or
+    ``model_copy(update=...)`` for per-use settings.
+    """
+    with _clients_lock:
+        if model not in _llm_clients:
+            azure_model_data = get_azure_model_data(model)
+            _llm_clients[model] = AzureChatOpenAI(
+                azure_endpoint=azure_model_data.endpoint,
+                api_key=azure_model_data.api_key,
+                api_version=azure_model_data.api_version,
+                azure_deployment=model.value,
+                streaming=True,
+                http_client=get_http_client(),
+                http_async_client=get_async_http_client(),
+            )
+        return _llm_clients[model]
 
 def get_embeddings(model: AzureModels):
-    azure_model_data = get_azure_model_data(model)
-    return AzureOpenAIEmbeddings(api_key=azure_model_data.api_key, 
-                                 azure_endpoint=azure_model_data.endpoint,
-                                 azure_deployment=model.value,
-                                 api_version=azure_model_data.api_version,
-                                 )
+    with _clients_lock:
+        if model not in _embedding_clients:
+            azure_model_data = get_azure_model_data(model)
+            _embedding_clients[model] = AzureOpenAIEmbeddings(api_key=azure_model_data.api_key,
+                                         azure_endpoint=azure_model_data.endpoint,
+                                         azure_deployment=model.value,
+                                         api_version=azure_model_data.api_version,
+                                         http_client=get_http_client(),
+                                         http_async_client=get_async_http_client(),
+                                         )
+        return _embedding_clients[model]
+
+
+def _pool_stats(*transports) -> dict:
+    # httpx doesn't expose its pool, read it off the httpcore transport when available
+    stats = {"connections": 0, "active": 0, "idle": 0, "queued_requests": 0}
+    for transport in transports:
+        pool = getattr(transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        idle = sum(1 for connection in connections if connection.is_idle())
+        stats["connections"] += len(connections)
+        stats["active"] += len(connections) - idle
+        stats["idle"] += idle
+        stats["queued_requests"] += len(getattr(pool, "_requests", []))
+    return stats
+
 
+def http_pool_stats() -> dict:
+    return {
+        "limits": {
+            "max_connections": LLM_HTTP_MAX_CONNECTIONS,
+            "max_keepalive_connections": LLM_HTTP_MAX_KEEPALIVE,
+            "keepalive_expiry": LLM_HTTP_KEEPALIVE_EXPIRY,
+        },
+        "http2": _http2_enabled(),
+        "sync": _pool_stats(_http_client._transport) if _http_client else None,
+        "async": _pool_stats(*_async_http_client._transport.transports()) if _async_http_client else None,
+        "event_loops": len(_async_http_client._transport.transports()) if _async_http_client else 0,
+        "llm_clients": [model.value for model in _llm_clients],
+    }
@@ -1,47 +1,243 @@
-
 import websockets
 import websockets.connection
 import asyncio
 import json
-from config import ELEVENLABS_API_KEY
+import time
+from collections import deque
+from typing import Optional
+from config import ELEVENLABS_API_KEY, ELEVENLABS_POOL_SIZE, ELEVENLABS_POOL_RECYCLE_MARGIN
 from app.services.definitions.voiceinterface import StreamingVoiceInterface
 from app.models.context import ConversationContext
 from app.models.bot import Voices
+from app.utils.metrics import LatencyHistogram
 
 ELEVENLABS_STREAM_URL = "wss://api.elevenlabs.io/v1/text-to-speech/{ELEVENLABS_VOICE_ID}/stream-input"
 
+DEFAULT_OPTIONS = {
+    "model_id": "eleven_flash_v2_5",
+    "output_format": "ulaw_8000",
+    "inactivity_timeout": 180
+}
+
+# Backoff between failed connection attempts during a call, doubled after each failure
+RECONNECT_DELAY = 0.5
+MAX_RECONNECT_DELAY = 10
+
+ELEVENLABS_STATS = {
+    "connections_pooled": 0,
+    "connections_cold": 0,
+    "connect_errors": 0,
+    # From the first text sent on a socket to its first audio chunk
+    "ttfa_pooled": LatencyHistogram(),
+    "ttfa_cold": LatencyHistogram(),
+    "connect_cold": LatencyHistogram(),
+}
+
+
+def get_stream_url(voice_id : str, options : dict) -> str:
+    return ELEVENLABS_STREAM_URL.format(ELEVENLABS_VOICE_ID=voice_id) + "?" + "&".join([f"{key}={value}" for key, value in options.items()])
+
+
+def text_message(text : str, flush : bool = False) -> str:
+    return json.dumps({
+        "text": text + " " * (flush),
+        "voice_settings": {"stability": 0.5, "similarity_boost": 0.8, "use_speaker_boost": False},
+        "xi_api_key": ELEVENLABS_API_KEY,
+        "flush": flush
+    })
+
+
+async def open_stream(voice_id : str, options : dict) -> websockets.WebSocketClientProtocol:
+    ws = await websockets.connect(get_stream_url(voice_id, options))
+    # BOS message, opens the stream and warms the model for this voice
+    await ws.send(text_message(" "))
+    return ws
+
+
+class ElevenLabsSocketPool:
+    """Pre-connected stream-input sockets per (voice, model).
+
+    Calls check a socket out when they start, and the pool is topped back up in
+    the background. Idle sockets are replaced before ElevenLabs closes them for
+    inactivity.
+    """
+
+    def __init__(self, size : int, recycle_margin : float, check_interval : float = 5.0):
+        self.size = size
+        self.max_age = DEFAULT_OPTIONS["inactivity_timeout"] - recycle_margin
+        self.check_interval = check_interval
+        self._idle : dict[tuple[str, str], deque[tuple[float, websockets.WebSocketClientProtocol]]] = {}
+        self._wake = asyncio.Event()
+        self._task : Optional[asyncio.Task] = None
+
+    def ensure(self, voice_id : str, model_id : str = DEFAULT_OPTIONS["model_id"]):
+        if (voice_id, model_id) not in self._idle:
+            self._idle[(voice_id, model_id)] = deque()
+            self._wake.set()
+
+    async def checkout(self, voice_id : str, model_id : str) -> Optional[websockets.WebSocketClientProtocol]:
+        if self._task is None or self.size <= 0:
+            return None
+
+        self.ensure(voice_id, model_id)
+        idle = self._idle[(voice_id, model_id)]
+        now = time.monotonic()
+        ws = None
+        while idle:
+            opened_at, candidate = idle.pop()
+            if not candidate.closed and now - opened_at < self.max_age:
+                ws = candidate
+                break
+            await candidate.close()
+
+        self._wake.set()
+        return ws
+
+    async def _refill(self, key : tuple[str, str]):
+        idle = self._idle[key]
+        now = time.monotonic()
+
+        for entry in list(idle):
+            opened_at, ws = entry
+            if ws.closed or now - opened_at >= self.max_age:
+                idle.remove(entry)
+                await ws.close()
+
+        missing = self.size - len(idle)
+        if missing <= 0:
+            return
+
+        voice_id, model_id = key
+        options = {**DEFAULT_OPTIONS, "model_id": model_id}
+        results = await asyncio.gather(
+            *[open_stream(voice_id, options) for _ in range(missing)], return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                print("Error opening pooled ElevenLabs connection: ", result)
+                continue
+            # Oldest first so the freshest socket is checked out next
+            idle.appendleft((time.monotonic(), result))
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            for key in list(self._idle):
+                try:
+                    await self._refill(key)
+                except Exception as e:
+                    print("Error refilling ElevenLabs pool: ", e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.check_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None and self.size > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for idle in self._idle.values():
+            while idle:
+                _, ws = idle.pop()
+                await ws.close()
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": {f"{voice_id}/{model_id}": len(idle) for (voice_id, model_id), idle in self._idle.items()},
+            "connections_pooled": ELEVENLABS_STATS["connections_pooled"],
+            "connections_cold": ELEVENLABS_STATS["connections_cold"],
+            "ttfa_pooled": ELEVENLABS_STATS["ttfa_pooled"].snapshot(),
+            "ttfa_cold": ELEVENLABS_STATS["ttfa_cold"].snapshot(),
+            "connect_errors": ELEVENLABS_STATS["connect_errors"],
+            "connect_cold": ELEVENLABS_STATS["connect_cold"].snapshot(),
+        }
+
+
+ELEVENLABS_POOL = ElevenLabsSocketPool(ELEVENLABS_POOL_SIZE, ELEVENLABS_POOL_RECYCLE_MARGIN)
+
+
 class ElevenLabsClient(StreamingVoiceInterface):
 
     def __init__(self, voice_id: Voices = Voices.KAJEN):
         self.voice = voice_id
-        self.stream_url = ELEVENLABS_STREAM_URL
         self.options = self._get_default_options()
         self.ws_connection : websockets.WebSocketClientProtocol = None
         self.started = False
+        self.stopped = False
+        self.connected = asyncio.Event()
+        self.voice_ready = asyncio.Event()
+        self.pooled = False
+        self.first_text_at : Optional[float] = None
+        self.first_audio_received = False
         self.ignore_incoming_audio = False
-        self.on_audio_received_callback = None   
+        self.on_audio_received_callback = None
 
     def on_audiogen_response_received(self, func : callable) -> None:
         self.on_audio_received_callback = func
 
+    async def _connect(self) -> websockets.WebSocketClientProtocol:
+        ws = await ELEVENLABS_POOL.checkout(self.voice.value, self.options["model_id"])
+        self.pooled = ws is not None
+        if ws is not None:
+            ELEVENLABS_STATS["connections_pooled"] += 1
+            return ws
+
+        started = time.perf_counter()
+        ws = await open_stream(self.voice.value, self.options)
+        ELEVENLABS_STATS["connections_cold"] += 1
+        ELEVENLABS_STATS["connect_cold"].observe(time.perf_counter() - started)
+        return ws
+
     async def start_connection(self):
+        # The voice is only known once the call has started
+        await self.voice_ready.wait()
         print("Starting ElevenLabs connection")
-        stream_url = self.stream_url.format(ELEVENLABS_VOICE_ID=self.voice.value) + "?" + "&".join([f"{key}={value}" for key, value in self.options.items()])
-        async with websockets.connect(stream_url) as ws:
+
+        # A reset closes the socket to drop queued synthesis, reconnect until the call stops
+        delay = RECONNECT_DELAY
+        while not self.stopped:
+            try:
+                ws = await self._connect()
+            except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as e:
+                ELEVENLABS_STATS["connect_errors"] += 1
+                print(f"Elevenlabs connection failed, retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+                continue
+            delay = RECONNECT_DELAY
             self.ws_connection = ws
+            self.first_text_at = None
+            self.first_audio_received = False
             self.started = True
-            
-            await self.send_audio_request(" ")
-            print("Elevenlabs connected")
+            self.connected.set()
+            print("Elevenlabs connected", "(pooled)" if self.pooled else "(cold)")
 
-            await self._receive_message()
+            try:
+                await self._receive_message()
+            finally:
+                self.connected.clear()
+                await ws.close()
 
     async def stop_connection(self):
+        self.stopped = True
+        self.voice_ready.set()
         if not self.started:
             return
         await self.ws_connection.close()
         self.started = False
 
+    async def reset(self):
+        # ElevenLabs has no way to cancel text already sent on a stream, so the stream is replaced
+        if not self.started or not self.connected.is_set():
+            return
+        self.connected.clear()
+        await self.ws_connection.close()
+
     def set_ignore_incoming_audio(self, ignore : bool):
         self.ignore_incoming_audio = ignore
 
@@ -61,10 +257,15 @@ class ElevenLabsClient(StreamingVoiceInterface):
                 # print("Received Elevenlabs message", msg)
 
                 response : dict = json.loads(msg)
-                
+
 
                 if response.get('audio') and self.on_audio_received_callback:
 
+                    if self.first_text_at is not None and not self.first_audio_received:
+                        ttfa = ELEVENLABS_STATS["ttfa_pooled" if self.pooled else "ttfa_cold"]
+                        ttfa.observe(time.perf_counter() - self.first_text_at)
+                        self.first_audio_received = True
+
                     if asyncio.iscoroutinefunction(self.on_audio_received_callback):
                         await self.on_audio_received_callback(response['audio'])
                     else:
@@ -76,15 +277,15 @@ class ElevenLabsClient(StreamingVoiceInterface):
     async def send_audio_request(self, text, flush=False):
 
         try:
-            
+            if text.strip() and not self.connected.is_set():
+                await self.connected.wait()
+
+            if text.strip() and self.first_text_at is None and self.ws_connection is not None:
+                self.first_text_at = time.perf_counter()
+
             # print("Sending request to elevenlabs: ", text)
 
-            await self.ws_connection.send(json.dumps({
-                    "text": text + " " * (flush),
-                    "voice_settings": {"stability": 0.5, "similarity_boost": 0.8, "use_speaker_boost": False},
-                    "xi_api_key": ELEVENLABS_API_KEY,
-                    "flush": flush
-                }))
+            await self.ws_connection.send(text_message(text, flush))
         except Exception as e:
             print("Error sending request to elevenlabs: ", e)
 
@@ -94,13 +295,8 @@ class ElevenLabsClient(StreamingVoiceInterface):
 
     async def initialize_from_start_data(self, conversation_context : ConversationContext):
         self.voice = conversation_context.bot.voice
+        self.voice_ready.set()
 
     @staticmethod
     def _get_default_options():
-        return {
-            "model_id": "eleven_flash_v2_5",
-            "output_format": "ulaw_8000",
-            "inactivity_timeout": 180
-        }
-    
-
+        return dict(DEFAULT_OPTIONS)
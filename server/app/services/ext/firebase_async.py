@@ -0,0 +1,31 @@
+from firebase_admin import firestore_async
+from google.cloud.firestore import AsyncClient
+from typing import Optional
+# Initializes the firebase app
+import app.services.ext.firebase_db  # noqa: F401
+
+# Async Firestore access for aiohttp handlers, awaiting the gRPC calls instead of blocking the
+# event loop that carries live call audio. Only what the handlers read lives here, everything
+# else, and all Celery task access, goes through firebase_db.
+
+_db : Optional[AsyncClient] = None
+
+
+def get_async_db() -> AsyncClient:
+    """Process-wide async Firestore client for code running on the event loop.
+
+    Created on first use, so its gRPC channel binds to the running loop.
+    """
+    global _db
+    if _db is None:
+        _db = firestore_async.client()
+    return _db
+
+
+async def get_user_goals(user_id: str) -> dict:
+    # One read for the whole document, callers pick the fields they need
+    doc = await get_async_db().collection("user_goals").document(user_id).get()
+    if not doc.exists:
+        return {}
+    return doc.to_dict() or {}
+
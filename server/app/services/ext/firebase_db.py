@@ -1,6 +1,8 @@
 import firebase_admin
 from firebase_admin import credentials, firestore
 from firebase_admin import storage
+from google.cloud.firestore_v1.base_query import FieldFilter
+import hashlib
 import json
 import time
 import datetime
@@ -8,11 +10,28 @@ import datetime
 cred = credentials.Certificate("app/firebase_creds.json")
 firebase_admin.initialize_app(cred)
 
+_db = None
+
+# Subcollections of user_goals/{user_id} for the histories that grow every day
+DAILY_ACTION_LOGS = "daily_action_logs"
+TASKS = "tasks"
+
+
+def get_db():
+    """Process-wide sync Firestore client, for Celery tasks and other code off the event loop.
+
+    Async handlers use app.services.ext.firebase_async instead.
+    """
+    global _db
+    if _db is None:
+        _db = firestore.client()
+    return _db
+
 
 # Function to create a new user with long term goals
 def create_document_in_bucket(user_id: str, long_term_goals: list):
     # Get Firestore client
-    db = firestore.client()
+    db = get_db()
     collection_name = "user_goals"
 
     # Document data
@@ -38,7 +57,7 @@ def create_document_in_bucket(user_id: str, long_term_goals: list):
 
 def create_long_term_goals(user_id: str, long_term_goals: list):
     # Get Firestore client
-    db = firestore.client()
+    db = get_db()
     collection_name = "user_goals"
 
     # Document data for long-term goals
@@ -61,7 +80,7 @@ def create_long_term_goals(user_id: str, long_term_goals: list):
 
 # Function to get the user's long term goals
 def get_long_term_goal_descriptions(user_id: str):
-    db = firestore.client()
+    db = get_db()
     collection_name = "user_goals"
     doc_ref = db.collection(collection_name).document(user_id)
     doc = doc_ref.get()
@@ -73,7 +92,7 @@ def get_long_term_goal_descriptions(user_id: str):
 
 # Get all habits names and descriptions
 def get_habits_data(user_id: str):
-    db = firestore.client()
+    db = get_db()
     collection_name = "user_goals"
     doc_ref = db.collection(collection_name).document(user_id)
     doc = doc_ref.get()
@@ -84,20 +103,16 @@ def get_habits_data(user_id: str):
 # [{'name': 'Yo', 'description': ''}, {'name': 'Go gym', 'description': ''}, {'name': 'Go gym', 'description': ''}, {'name': 'Job', 'description': ''}, {'name': 'Morning Workout', 'description': ''}, {'name': 'Night Workout', 'description': 'This is a habit description'}]
 
 
-def add_habit(user_id: str, habit_name: str, description: str, frequency_type: str = "daily", frequency_days: list = None):
-    db = firestore.client()
-    collection_name = "user_goals"
-    doc_ref = db.collection(collection_name).document(user_id)
-    
-    doc = doc_ref.get()
-    if doc.exists:
-        data = doc.to_dict()
-    else:
-        data = {}
+_last_habit_id = 0
 
-    # Build the new habit object
-    new_habit = {
-        "id": str(int(time.time())),
+
+def build_habit(habit_name: str, description: str, frequency_type: str = "daily", frequency_days: list = None):
+    # Millisecond ids like the app's, kept unique when several habits are built at once
+    global _last_habit_id
+    _last_habit_id = max(int(time.time() * 1000), _last_habit_id + 1)
+
+    return {
+        "id": str(_last_habit_id),
         "name": habit_name,
         "frequency": {
             "type": frequency_type,
@@ -110,18 +125,47 @@ def add_habit(user_id: str, habit_name: str, description: str, frequency_type: s
         "description": description
     }
 
-    # Append to existing habits or create a new list
-    if "habits" in data and isinstance(data["habits"], list):
-        data["habits"].append(new_habit)
-    else:
-        data["habits"] = [new_habit]
 
-    # Update/set the document
-    doc_ref.set(data, merge=True)
+def add_habit(user_id: str, habit_name: str, description: str, frequency_type: str = "daily", frequency_days: list = None):
+    db = get_db()
+    collection_name = "user_goals"
+    doc_ref = db.collection(collection_name).document(user_id)
+
+    # Appended server side in one write, so concurrent writers don't overwrite each other
+    new_habit = build_habit(habit_name, description, frequency_type, frequency_days)
+    doc_ref.set({"habits": firestore.ArrayUnion([new_habit])}, merge=True)
 
     return f"Habit '{habit_name}' added successfully for user_id '{user_id}' in '{collection_name}' collection."
 
 
+def update_user_goals(user_id: str, long_term_goals: list = None, habits: list = None, daily_actions: list = None, batch=None):
+    """Applies several goal updates to the user document in a single atomic write.
+
+    Pass a WriteBatch to commit them together with other documents' writes instead.
+    """
+    db = get_db()
+    collection_name = "user_goals"
+    doc_ref = db.collection(collection_name).document(user_id)
+
+    document_data = {}
+    if long_term_goals is not None:
+        document_data["long_term_goals"] = long_term_goals
+    if habits:
+        document_data["habits"] = firestore.ArrayUnion(habits)
+    if daily_actions:
+        document_data["daily_action"] = firestore.ArrayUnion(daily_actions)
+
+    if not document_data:
+        return
+
+    if batch is not None:
+        batch.set(doc_ref, document_data, merge=True)
+    else:
+        doc_ref.set(document_data, merge=True)
+
+    return f"Goals updated successfully for user_id '{user_id}' in '{collection_name}' collection."
+
+
 # USER_ID = "8dc48926-c159-400d-b229-4fc02021625f"
 # HABIT_NAME = "Night Workout"
 # FREQUENCY_TYPE = "weekly"
@@ -138,33 +182,20 @@ def add_habit(user_id: str, habit_name: str, description: str, frequency_type: s
 # Function to add a daily action to a user
 def add_daily_action(user_id: str, action_name: str, action_description: str):
     # Get Firestore client
-    db = firestore.client()
+    db = get_db()
     collection_name = "user_goals"
 
     # Reference to the user document
     doc_ref = db.collection(collection_name).document(user_id)
 
-    # Fetch the existing document data
-    doc = doc_ref.get()
-    if doc.exists:
-        data = doc.to_dict()
-    else:
-        data = {}
-
     # Prepare the new daily action
     new_action = {
         "Name": action_name,
         "Description": action_description
     }
 
-    # Append the new action to the daily_action array
-    if "daily_action" in data:
-        data["daily_action"].append(new_action)
-    else:
-        data["daily_action"] = [new_action]
-
-    # Update the document with the new data
-    doc_ref.set(data)
+    # Append the new action to the daily_action array server side
+    doc_ref.set({"daily_action": firestore.ArrayUnion([new_action])}, merge=True)
 
     return f"Daily action added successfully to user_id '{user_id}' in '{collection_name}' collection."
 
@@ -177,7 +208,7 @@ def add_daily_action(user_id: str, action_name: str, action_description: str):
 # Function to get the user's daily actions
 def get_daily_actions(user_id: str):
     # Get Firestore client
-    db = firestore.client()
+    db = get_db()
     collection_name = "user_goals"
 
     # Reference to the user document
@@ -200,16 +231,10 @@ def get_daily_actions(user_id: str):
 
 # Function to store log of all daily actions
 def log_daily_action_completion(user_id: str, date: str, action_name: str, action_description: str, completed: bool):
-    db = firestore.client()
+    db = get_db()
     collection_name = "user_goals"
-    doc_ref = db.collection(collection_name).document(user_id)
-
-    # Fetch the existing document data
-    doc = doc_ref.get()
-    if doc.exists:
-        data = doc.to_dict()
-    else:
-        data = {}
+    # One document per day under the user, so the user_goals document doesn't grow with the history
+    log_ref = db.collection(collection_name).document(user_id).collection(DAILY_ACTION_LOGS).document(date)
 
     # Prepare the daily action completion data
     action_data = {
@@ -218,17 +243,8 @@ def log_daily_action_completion(user_id: str, date: str, action_name: str, actio
         "Completed": completed
     }
 
-    # Add the completion data to the specified date
-    if "daily_action_logs" not in data:
-        data["daily_action_logs"] = {}
-
-    if date not in data["daily_action_logs"]:
-        data["daily_action_logs"][date] = []
-
-    data["daily_action_logs"][date].append(action_data)
-
-    # Update the document with the new data
-    doc_ref.set(data)
+    # The ArrayUnion appends to the day's entries server side
+    log_ref.set({"date": date, "entries": firestore.ArrayUnion([action_data])}, merge=True)
 
     return f"Daily action for date '{date}' logged successfully to user_id '{user_id}' in '{collection_name}' collection."
 
@@ -243,13 +259,16 @@ def log_daily_action_completion(user_id: str, date: str, action_name: str, actio
 # print(response)
 
 
-# Function to get the user's daily action logs
-def get_daily_action_logs(user_id: str):
-    db = firestore.client()
+# Function to get the user's daily action logs, optionally between two dates (YYYY-MM-DD, inclusive)
+def get_daily_action_logs(user_id: str, start_date: str = None, end_date: str = None):
+    db = get_db()
     collection_name = "user_goals"
-    doc_ref = db.collection(collection_name).document(user_id)
-    doc = doc_ref.get()
-    return doc.to_dict().get("daily_action_logs", {})
+    query = db.collection(collection_name).document(user_id).collection(DAILY_ACTION_LOGS)
+    if start_date is not None:
+        query = query.where(filter=FieldFilter("date", ">=", start_date))
+    if end_date is not None:
+        query = query.where(filter=FieldFilter("date", "<=", end_date))
+    return {doc.id: doc.to_dict().get("entries", []) for doc in query.order_by("date").stream()}
 
 # USER_ID = "example_user_id"
 # daily_action_logs = get_daily_action_logs(USER_ID)
@@ -258,8 +277,7 @@ def get_daily_action_logs(user_id: str):
 
 # Function to get the user's daily action logs for a specific date
 def get_daily_action_logs_for_date(user_id: str, date: str):
-    daily_action_logs = get_daily_action_logs(user_id)
-    return daily_action_logs.get(date, [])
+    return get_daily_action_logs(user_id, start_date=date, end_date=date).get(date, [])
 
 # USER_ID = "example_user_id"
 # DATE = "2024-12-30"
@@ -268,26 +286,22 @@ def get_daily_action_logs_for_date(user_id: str, date: str):
 # # [{'Completed': True, 'Name': 'Smoking', 'Description': 'I want to quit smoking'}, {'Description': 'I want to go to the gym everyday', 'Name': 'Gym', 'Completed': True}]
 
 
+def task_doc_id(task: dict) -> str:
+    # Keyed by creation date then content, so re-adding the same task overwrites it like the ArrayUnion did.
+    # Legacy tasks can hold Firestore Timestamps, which hash by their string form.
+    digest = hashlib.sha1(json.dumps(task, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+    return f"{str(task.get('createdAt', ''))[:10]}-{digest}"
+
+
 # Create a task list for a user
 def add_task_list(user_id: str, tasks: list):
     # Get Firestore client
-    db = firestore.client()
+    db = get_db()
     collection_name = "user_goals"
-    # Reference to the user document
-    doc_ref = db.collection(collection_name).document(user_id)
+    # One document per task under the user, written together in one batch
+    tasks_ref = db.collection(collection_name).document(user_id).collection(TASKS)
 
-    # Fetch the existing document data
-    doc = doc_ref.get()
-    if doc.exists:
-        data = doc.to_dict()
-    else:
-        data = {}
-
-    # Initialize tasks list if not present
-    if "tasks" not in data:
-        data["tasks"] = []
-
-    # Add the new tasks to the list
+    batch = db.batch()
     for task in tasks:
         task_data = {
             "name": task["name"],
@@ -296,10 +310,8 @@ def add_task_list(user_id: str, tasks: list):
             "completed": task["completed"],
             "createdAt": task["createdAt"]
         }
-        data["tasks"].append(task_data)
-
-    # Update the document with the new tasks
-    doc_ref.set(data)
+        batch.set(tasks_ref.document(task_doc_id(task_data)), task_data)
+    batch.commit()
 
     return f"Tasks added successfully to user_id '{user_id}' in '{collection_name}' collection."
 
@@ -327,11 +339,10 @@ def add_task_list(user_id: str, tasks: list):
 
 # Function to get the user's task list
 def get_task_list(user_id: str):
-    db = firestore.client()
+    db = get_db()
     collection_name = "user_goals"
-    doc_ref = db.collection(collection_name).document(user_id)
-    doc = doc_ref.get()
-    return doc.to_dict().get("tasks", [])
+    tasks_ref = db.collection(collection_name).document(user_id).collection(TASKS)
+    return sorted((doc.to_dict() for doc in tasks_ref.stream()), key=lambda task: str(task.get("createdAt", "")))
 
 # USER_ID = "example_user_id"
 # task_list = get_task_list(USER_ID)
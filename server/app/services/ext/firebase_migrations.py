@@ -0,0 +1,86 @@
+# Moves the daily_action_logs map and tasks array off each user_goals document into the
+# dated subcollections firebase_db now writes to. Safe to re-run, the copies are idempotent and
+# a user's old fields are only deleted after all of their copies are committed.
+# Run from server/: python -m app.services.ext.firebase_migrations [--dry-run]
+import argparse
+from firebase_admin import firestore
+from app.services.ext.firebase_db import get_db, task_doc_id, DAILY_ACTION_LOGS, TASKS
+
+# Firestore caps a batch at 500 writes
+MAX_BATCH_WRITES = 500
+
+
+class BatchWriter:
+
+    def __init__(self, db, size : int, dry_run : bool):
+        self.db = db
+        self.size = size
+        self.dry_run = dry_run
+        self.batch = db.batch()
+        self.pending = 0
+        self.writes = 0
+        self.commits = 0
+
+    def set(self, ref, data : dict, merge : bool = False):
+        self.batch.set(ref, data, merge=merge)
+        self._added()
+
+    def update(self, ref, data : dict):
+        self.batch.update(ref, data)
+        self._added()
+
+    def _added(self):
+        self.pending += 1
+        self.writes += 1
+        if self.pending >= self.size:
+            self.commit()
+
+    def commit(self):
+        if self.pending and not self.dry_run:
+            self.batch.commit()
+            self.commits += 1
+        self.batch = self.db.batch()
+        self.pending = 0
+
+
+def migrate_user_goals(dry_run : bool = False, batch_size : int = MAX_BATCH_WRITES) -> dict:
+    db = get_db()
+    writer = BatchWriter(db, min(batch_size, MAX_BATCH_WRITES), dry_run)
+    stats = {"users": 0, "migrated_users": 0, "log_days": 0, "tasks": 0}
+
+    # Only the legacy fields are downloaded, one document at a time
+    for doc in db.collection("user_goals").select([DAILY_ACTION_LOGS, TASKS]).stream():
+        stats["users"] += 1
+        data = doc.to_dict() or {}
+        daily_action_logs = data.get(DAILY_ACTION_LOGS)
+        tasks = data.get(TASKS)
+        if daily_action_logs is None and tasks is None:
+            continue
+
+        for date, entries in (daily_action_logs or {}).items():
+            log_ref = doc.reference.collection(DAILY_ACTION_LOGS).document(date)
+            writer.set(log_ref, {"date": date, "entries": firestore.ArrayUnion(entries)}, merge=True)
+            stats["log_days"] += 1
+
+        for task in tasks or []:
+            writer.set(doc.reference.collection(TASKS).document(task_doc_id(task)), task)
+            stats["tasks"] += 1
+
+        # Queued after the copies, so it lands in the same or a later batch
+        writer.update(doc.reference, {DAILY_ACTION_LOGS: firestore.DELETE_FIELD, TASKS: firestore.DELETE_FIELD})
+        stats["migrated_users"] += 1
+
+    writer.commit()
+    stats["writes"] = writer.writes
+    stats["commits"] = writer.commits
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move daily action logs and tasks into user_goals subcollections")
+    parser.add_argument("--dry-run", action="store_true", help="Count what would be moved without writing")
+    parser.add_argument("--batch-size", type=int, default=MAX_BATCH_WRITES)
+    args = parser.parse_args()
+
+    stats = migrate_user_goals(dry_run=args.dry_run, batch_size=args.batch_size)
+    print("Dry run: " if args.dry_run else "Migrated: ", stats)
@@ -1,21 +1,146 @@
 
 from aiohttp import web
+import asyncio
 import json
+import time
+from collections import deque
 from app.services.core.observers import CallObserver, CallEvent
 import base64
-from app.utils.audio import convert_mulaw_to_b64
-from typing import Any
+from app.utils.audio import (
+    AudioPayload,
+    AudioFrameAggregator,
+    PlaybackPosition,
+    FRAME_MS,
+    MULAW_BYTES_PER_MS,
+)
+from config import INBOUND_AUDIO_BLOCK_MS, PLAYOUT_PACING, PLAYOUT_LEAD_MS, PLAYOUT_MARK_INTERVAL_MS
+from typing import Any, Optional
 from twilio.twiml.voice_response import VoiceResponse, Pause, Say, Start,Connect, Parameter, Play, Conference, Dial
 from twilio.rest import Client
 
 
+MEDIA_EVENT_PREFIX = '{"event":"media"'
+PAYLOAD_MARKER = '"payload":"'
+
+
+def parse_media_payload(raw : str) -> Optional[str]:
+    """Base64 payload of a Twilio media event, without a full json.loads.
+
+    Returns None for any other message, or a media message in an unexpected shape.
+    """
+    if not raw.startswith(MEDIA_EVENT_PREFIX):
+        return None
+    start = raw.find(PAYLOAD_MARKER)
+    if start == -1:
+        return None
+    start += len(PAYLOAD_MARKER)
+    end = raw.find('"', start)
+    if end == -1:
+        return None
+    return raw[start:end]
+
+
+class OutboundPlayout:
+    """Paces agent audio to Twilio in frames of about 20 ms.
+
+    Only lead_ms of audio is kept queued at Twilio, so a clear drops very little.
+    Marks sent along with the audio come back once the caller has heard
+    everything before them, which gives the confirmed playback position.
+    """
+
+    def __init__(self, client : "TwilioCallStreamClient", lead_ms : int, mark_interval_ms : int):
+        self.client = client
+        self.lead_ms = lead_ms
+        self.mark_interval_ms = mark_interval_ms
+
+        # Base64 frames and their duration, sliced from the TTS payload without re-encoding
+        self.frames : deque[tuple[str, float]] = deque()
+        self.frames_ready = asyncio.Event()
+        self.sent_ms = 0.0
+        self.played_ms = 0
+        self.last_mark_ms = 0.0
+        # Confirmed position and when it was confirmed, playback runs on in real time from there
+        self.anchor_ms = 0
+        self.anchor_time = time.monotonic()
+        self.task : Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    @property
+    def position(self) -> PlaybackPosition:
+        return PlaybackPosition(int(self.sent_ms), int(self.played_ms))
+
+    def estimated_played_ms(self) -> float:
+        return min(self.sent_ms, self.anchor_ms + (time.monotonic() - self.anchor_time) * 1000)
+
+    def enqueue(self, audio : AudioPayload):
+        self.frames.extend((frame, size / MULAW_BYTES_PER_MS) for frame, size in audio.frames(FRAME_MS * MULAW_BYTES_PER_MS))
+        self.frames_ready.set()
+
+    async def _run(self):
+        while True:
+            if not self.frames:
+                self.frames_ready.clear()
+                await self.frames_ready.wait()
+                continue
+
+            played = self.estimated_played_ms()
+            if played >= self.sent_ms:
+                # Twilio ran dry, playback restarts with this frame
+                self.anchor_ms = self.sent_ms
+                self.anchor_time = time.monotonic()
+                played = self.sent_ms
+
+            ahead = self.sent_ms - played
+            if ahead >= self.lead_ms:
+                await asyncio.sleep((ahead - self.lead_ms + FRAME_MS) / 1000)
+                continue
+
+            frame, duration_ms = self.frames.popleft()
+            await self.client.send_media(frame)
+            self.sent_ms += duration_ms
+
+            if self.sent_ms - self.last_mark_ms >= self.mark_interval_ms or not self.frames:
+                await self.client.send_mark(str(int(self.sent_ms)))
+                self.last_mark_ms = self.sent_ms
+
+    def on_mark(self, name : str) -> bool:
+        try:
+            mark_ms = int(name)
+        except ValueError:
+            return False
+        if mark_ms <= self.played_ms:
+            return False
+        self.played_ms = mark_ms
+        self.anchor_ms = mark_ms
+        self.anchor_time = time.monotonic()
+        return True
+
+    def clear(self):
+        # Everything sent is dropped at Twilio, the marks it returns for it are stale
+        self.frames.clear()
+        self.played_ms = self.sent_ms
+        self.last_mark_ms = self.sent_ms
+        self.anchor_ms = self.sent_ms
+        self.anchor_time = time.monotonic()
+
+
 class TwilioCallStreamClient:
 
     def __init__(self, call_observers : list[CallObserver]):
         self.ws = web.WebSocketResponse()
         self.stream_sid = None
+        self.media_frame_prefix = ""
         self.call_observers = call_observers
-        
+        self.inbound_audio = AudioFrameAggregator(INBOUND_AUDIO_BLOCK_MS)
+        self.playout = OutboundPlayout(self, PLAYOUT_LEAD_MS, PLAYOUT_MARK_INTERVAL_MS) if PLAYOUT_PACING else None
 
     async def notify_observers(self, event : CallEvent, data : Any):
         for observer in self.call_observers:
@@ -23,22 +148,43 @@ class TwilioCallStreamClient:
 
     async def start_connection(self, request : web.Request):
         await self.ws.prepare(request)
+        try:
+            await self._receive_messages()
+        finally:
+            if self.playout is not None:
+                self.playout.stop()
 
+    async def _receive_messages(self):
         async for msg in self.ws:
             if msg.type == web.WSMsgType.TEXT:
+                # Media frames arrive every 20 ms, skip the full parse for them
+                payload = parse_media_payload(msg.data)
+                if payload is not None:
+                    await self.handle_media(payload)
+                    continue
+
                 data : dict = json.loads(msg.data)
                 event = data.get("event")
 
                 if event == 'start':
                     start_data = data.get("start")
                     self.stream_sid = start_data.get("streamSid")
+                    self.media_frame_prefix = json.dumps({"event": "media", "streamSid": self.stream_sid})[:-1] + ', "media": {"payload": "'
+                    if self.playout is not None:
+                        self.playout.start()
                     await self.notify_observers(CallEvent.CALL_STARTED, start_data)
-                    
+
+                elif event == 'mark':
+                    if self.playout is not None and self.playout.on_mark(data.get("mark", {}).get("name", "")):
+                        await self.notify_observers(CallEvent.PLAYBACK_UPDATED, self.playout.position)
+
                 elif event == 'media':
-                    media_data = data.get("media", {}).get("payload", "")
-                    await self.notify_observers(CallEvent.AUDIO_CHUNK, 
-                                                base64.b64decode(media_data))  
+                    await self.handle_media(data.get("media", {}).get("payload", ""))
+
                 elif event == 'stop':
+                    block = self.inbound_audio.flush()
+                    if block:
+                        await self.notify_observers(CallEvent.AUDIO_CHUNK, block)
                     await self.notify_observers(CallEvent.CALL_ENDED, "stopped")
 
 
@@ -46,21 +192,36 @@ class TwilioCallStreamClient:
                 print(f"Error: {msg.data}")
 
 
+    async def handle_media(self, payload : str):
+        block = self.inbound_audio.add(base64.b64decode(payload))
+        if block:
+            await self.notify_observers(CallEvent.AUDIO_CHUNK, block)
+
     async def send_clear(self, *args):
         clear_msg = {"event": "clear", "streamSid": self.stream_sid}
         print("sending clear message")
         await self.ws.send_str(json.dumps(clear_msg))
+        if self.playout is not None:
+            self.playout.clear()
+            await self.notify_observers(CallEvent.PLAYBACK_UPDATED, self.playout.position)
+
+    async def send_audio(self, audio : AudioPayload | bytes):
+
+        if isinstance(audio, bytes):
+            audio = AudioPayload.from_bytes(audio)
+
+        if self.playout is not None:
+            self.playout.enqueue(audio)
+            return
+
+        await self.send_media(audio.b64)
+
+    async def send_media(self, payload_b64 : str):
+        # Base64 never needs JSON escaping, so the payload is spliced into a preformatted frame
+        await self.ws.send_str(self.media_frame_prefix + payload_b64 + '"}}')
 
-    async def send_audio(self, audio_data : bytes):
-        
-        converted_chunk = convert_mulaw_to_b64(audio_data)
-        message = {
-            "event": "media",
-                "streamSid": self.stream_sid,
-                "media": {"payload": converted_chunk},
-            }
-        
-        await self.ws.send_str(json.dumps(message))
+    async def send_mark(self, name : str):
+        await self.ws.send_str(json.dumps({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": name}}))
 
 class TwimlStreamBuilder:
 
@@ -1,4 +1,5 @@
 from app.models.bot import BotBuilder, VoiceBot, Voices
+from app.services.core.segmenter import SegmenterConfig
 
 
 from dataclasses import dataclass
@@ -10,11 +11,16 @@ class VoiceBotBuilder(BotBuilder):
     sys_prompt : str = ""
     leading_prompt : str = ""
     voice : Voices = Voices.KAJEN
+    segmenter_config : SegmenterConfig = SegmenterConfig()
 
     def with_voice(self, voice : Voices):
         self.voice = voice
         return self
 
+    def with_segmenter_config(self, segmenter_config : SegmenterConfig):
+        self.segmenter_config = segmenter_config
+        return self
+
     def load_prompts(self):
         with open(f"resources/prompts/{self.id}/main.txt", "r") as f:
             self.sys_prompt = f.read()
@@ -22,5 +28,5 @@ class VoiceBotBuilder(BotBuilder):
         return self
 
     def build(self):
-        return VoiceBot(id=self.id, knowledge_base=self.knowledge_base, sys_prompt=self.sys_prompt, leading_prompt=self.leading_prompt, voice=self.voice)
+        return VoiceBot(id=self.id, knowledge_source=self.knowledge_source, sys_prompt=self.sys_prompt, leading_prompt=self.leading_prompt, voice=self.voice, segmenter_config=self.segmenter_config)
     
\ No newline at end of file
@@ -2,11 +2,88 @@ import base64
 from pydub import AudioSegment
 import audioop
 import io
+from typing import NamedTuple
 
 def convert_mulaw_to_b64(chunk_ulaw):
     b64 = base64.b64encode(chunk_ulaw).decode("utf-8")
     return b64
 
+class AudioPayload:
+    """Base64 μ-law audio as it arrives from TTS.
+
+    Forwarded to Twilio as is, the raw bytes are only decoded if someone reads ``bytes``.
+    """
+
+    __slots__ = ("b64", "_bytes")
+
+    def __init__(self, b64 : str):
+        self.b64 = b64
+        self._bytes = None
+
+    @classmethod
+    def from_bytes(cls, audio : bytes) -> "AudioPayload":
+        payload = cls(convert_mulaw_to_b64(audio))
+        payload._bytes = audio
+        return payload
+
+    @property
+    def bytes(self) -> bytes:
+        if self._bytes is None:
+            self._bytes = base64.b64decode(self.b64)
+        return self._bytes
+
+    def __len__(self):
+        # Decoded size, without decoding
+        return len(self.b64) * 3 // 4 - self.b64[-2:].count("=")
+
+    def frames(self, frame_bytes : int) -> list[tuple[str, int]]:
+        """Base64 frames of about frame_bytes each, with their decoded size, without decoding.
+
+        Every 3 bytes are exactly 4 base64 characters, so frames end on multiples of 3 bytes
+        and are sliced straight out of the string. 160 byte (20 ms) frames come out as
+        159, 159 and 162 bytes, keeping the 20 ms average.
+        """
+        total = len(self)
+        if total == 0:
+            return []
+        # Character offsets of the cuts, the last frame runs to the end and keeps the padding
+        cuts = [0] + [k * frame_bytes // 3 * 4 for k in range(1, -(-total // frame_bytes))] + [len(self.b64)]
+        frames = [(self.b64[start:end], (end - start) // 4 * 3) for start, end in zip(cuts, cuts[1:])]
+        frames[-1] = (frames[-1][0], total - cuts[-2] // 4 * 3)
+        return frames
+
+MULAW_BYTES_PER_MS = 8
+FRAME_MS = 20
+
+class PlaybackPosition(NamedTuple):
+    """Milliseconds of agent audio sent to the caller's phone, and confirmed played."""
+    sent_ms : int = 0
+    played_ms : int = 0
+
+    @property
+    def pending_ms(self) -> int:
+        return self.sent_ms - self.played_ms
+
+class AudioFrameAggregator:
+    """Collects small audio frames into blocks of at least block_ms."""
+
+    def __init__(self, block_ms : int):
+        self.block_size = block_ms * MULAW_BYTES_PER_MS
+        self.buffer = bytearray()
+
+    def add(self, frame : bytes) -> bytes | None:
+        self.buffer += frame
+        if len(self.buffer) < self.block_size:
+            return None
+        return self.flush()
+
+    def flush(self) -> bytes | None:
+        if not self.buffer:
+            return None
+        block = bytes(self.buffer)
+        self.buffer.clear()
+        return block
+
 class AudioConverter:
 
     def __init__(self):
@@ -1,4 +1,5 @@
 from json import loads
+import re
 import string
 import pandas as pd
 
@@ -11,6 +12,12 @@ def remove_trailing_punctuation(input_string: str) -> str:
 
     return ""
 
+_NON_WORD = re.compile(r"[^\w\s']")
+
+def normalize_utterance(input_string: str) -> str:
+    # Shared by speculation matching, the retrieval cache key and the turn classifier, keep them in step
+    return " ".join(_NON_WORD.sub(" ", input_string.lower()).split())
+
 def read_gsheet(sheet_url : str) -> pd.DataFrame:
     
     if "/view" in sheet_url:
@@ -1,5 +1,5 @@
 from celery import Celery, Task
-from config import CLOUDAMQP_URL, REDISCLOUD_URL
+from config import CLOUDAMQP_URL, REDISCLOUD_URL, POST_CALL_QUEUE
 from scheduler.schedule_config import beat_schedule
 
 
@@ -8,12 +8,14 @@ def celery_init_app() -> Celery:
     celery_app : Celery = Celery("celery_module",
                                  backend=REDISCLOUD_URL, 
                                  broker=CLOUDAMQP_URL, 
-                                 task_ignore_result=True)
+                                 task_ignore_result=True,
+                                 include=["scheduler.post_call"])
     
     celery_app.set_default()
     celery_app.autodiscover_tasks(packages=["scheduler"])
     celery_app.conf.timezone = "EST"
     celery_app.conf.beat_schedule = beat_schedule
+    celery_app.conf.task_routes = {"scheduler.post_call.*": {"queue": POST_CALL_QUEUE}}
     return celery_app
 
 celery_app = celery_init_app()
\ No newline at end of file
@@ -47,4 +47,53 @@ CLOUDAMQP_URL = os.getenv("CLOUDAMQP_URL")
 REDISCLOUD_URL = os.getenv("REDISCLOUD_URL")
 
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-SUPABASE_URL = os.getenv("SUPABASE_URL")
\ No newline at end of file
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 50_000))
+WARM_UP_KNOWLEDGE_BASES = os.getenv("WARM_UP_KNOWLEDGE_BASES", "true").lower() == "true"
+KNOWLEDGE_BASE_REFRESH_INTERVAL = float(os.getenv("KNOWLEDGE_BASE_REFRESH_INTERVAL", 300))
+
+# "memory" keeps a FAISS index per process, "mmap" shares on-disk snapshots between workers
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "memory")
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "data/vector_store/snapshots")
+
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", 2048))
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", 3600))
+
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", 64))
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", 5))
+
+TURN_CLASSIFIER_MODEL_PATH = os.getenv("TURN_CLASSIFIER_MODEL_PATH")
+
+# Start generating on interim transcripts that stay unchanged for SPECULATION_STABLE_MS
+SPECULATION_ENABLED = os.getenv("SPECULATION_ENABLED", "true").lower() == "true"
+SPECULATION_STABLE_MS = float(os.getenv("SPECULATION_STABLE_MS", 400))
+
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", 2000))
+CHAT_HISTORY_KEEP_TURNS = int(os.getenv("CHAT_HISTORY_KEEP_TURNS", 6))
+
+# Shared keep-alive pool for all Azure OpenAI clients, size it for peak concurrent calls
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 200))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", 50))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", 120))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true"
+
+# "direct" streams straight from the chat model, "events" goes through chain.astream_events
+RESPONSE_STREAM_MODE = os.getenv("RESPONSE_STREAM_MODE", "direct")
+
+# Pre-connected ElevenLabs sockets kept per (voice, model), recycled this many seconds before inactivity_timeout
+ELEVENLABS_POOL_SIZE = int(os.getenv("ELEVENLABS_POOL_SIZE", 2))
+ELEVENLABS_POOL_RECYCLE_MARGIN = float(os.getenv("ELEVENLABS_POOL_RECYCLE_MARGIN", 30))
+
+# Inbound Twilio audio is forwarded to Deepgram in blocks of this many ms (Twilio frames are 20 ms, 0 forwards every frame)
+INBOUND_AUDIO_BLOCK_MS = int(os.getenv("INBOUND_AUDIO_BLOCK_MS", 80))
+
+# Outbound audio is sent to Twilio in 20 ms frames, at most PLAYOUT_LEAD_MS ahead of what the caller has heard
+PLAYOUT_PACING = os.getenv("PLAYOUT_PACING", "true").lower() == "true"
+PLAYOUT_LEAD_MS = int(os.getenv("PLAYOUT_LEAD_MS", 240))
+PLAYOUT_MARK_INTERVAL_MS = int(os.getenv("PLAYOUT_MARK_INTERVAL_MS", 200))
+
+# Post-call evaluation runs on Celery workers consuming POST_CALL_QUEUE
+POST_CALL_QUEUE = os.getenv("POST_CALL_QUEUE", "post_call")
+POST_CALL_MAX_RETRIES = int(os.getenv("POST_CALL_MAX_RETRIES", 5))
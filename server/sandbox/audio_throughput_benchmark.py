@@ -0,0 +1,74 @@
+# Outbound audio throughput, ElevenLabs base64 chunk to Twilio media frame, in bytes/sec per core.
+# Compares the previous decode/re-encode/json.dumps path with the passthrough AudioPayload path,
+# and the cost of splitting audio into 20 ms frames when PLAYOUT_PACING is on.
+# Run from server/: python -m sandbox.audio_throughput_benchmark
+import asyncio
+import base64
+import json
+import os
+import time
+from app.services.ext.twilio import TwilioCallStreamClient, OutboundPlayout
+from app.utils.audio import AudioPayload, convert_mulaw_to_b64
+
+ROUNDS = 20_000
+# ElevenLabs ulaw_8000 chunks are a few hundred ms of audio
+CHUNK_SIZES = (1600, 4000, 8000)
+
+
+class NullSocket:
+    async def send_str(self, data):
+        pass
+
+
+def make_client() -> TwilioCallStreamClient:
+    client = TwilioCallStreamClient([])
+    client.ws = NullSocket()
+    client.stream_sid = "MZ00000000000000000000000000000000"
+    client.media_frame_prefix = json.dumps({"event": "media", "streamSid": client.stream_sid})[:-1] + ', "media": {"payload": "'
+    client.playout = None
+    return client
+
+
+async def legacy(client, audio_b64):
+    # Previous on_audio_generated + send_audio
+    audio_data = base64.b64decode(audio_b64)
+    message = {
+        "event": "media",
+        "streamSid": client.stream_sid,
+        "media": {"payload": convert_mulaw_to_b64(audio_data)},
+    }
+    await client.ws.send_str(json.dumps(message))
+
+
+async def passthrough(client, audio_b64):
+    await client.send_audio(AudioPayload(audio_b64))
+
+
+async def paced(client, audio_b64):
+    # Framing only, the frames are then sent by the playout task at real-time pace
+    if client.playout is None:
+        client.playout = OutboundPlayout(client, lead_ms=240, mark_interval_ms=200)
+    client.playout.enqueue(AudioPayload(audio_b64))
+    client.playout.frames.clear()
+
+
+async def bench(name, func, audio_b64, audio_bytes):
+    client = make_client()
+    start = time.process_time()
+    for _ in range(ROUNDS):
+        await func(client, audio_b64)
+    elapsed = time.process_time() - start
+    print(f"{name:>12}: {ROUNDS * audio_bytes / elapsed / 1e6:8.1f} MB/s per core, {elapsed / ROUNDS * 1e6:6.2f} us/chunk")
+
+
+async def main():
+    for size in CHUNK_SIZES:
+        audio_b64 = base64.b64encode(os.urandom(size)).decode("utf-8")
+        print(f"\n{size} byte chunks ({size / 8000 * 1000:.0f} ms of audio)")
+        await bench("legacy", legacy, audio_b64, size)
+        await bench("passthrough", passthrough, audio_b64, size)
+        await bench("paced", paced, audio_b64, size)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
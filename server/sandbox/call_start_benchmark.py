@@ -0,0 +1,46 @@
+# Measures ResponseEngine call-start setup with and without the compiled chain cache.
+# Run from server/: python -m sandbox.call_start_benchmark
+import os
+import time
+import statistics
+
+# Clients are only constructed, never called
+for key in ("AZURE_KEY_AI_gpt4o", "AZURE_KEY_AI_gpt4omini", "AZURE_KEY_ADA_EMBEDDINGS"):
+    os.environ.setdefault(key, "benchmark")
+for key in ("AZURE_ENDPOINT_AI_gpt4o", "AZURE_ENDPOINT_AI_gpt4omini", "AZURE_ENDPOINT_ADA_EMBEDDINGS"):
+    os.environ.setdefault(key, "https://benchmark.openai.azure.com")
+
+from app.services.core import response_tools as rg
+from app.services.core.response_engine import ResponseEngine
+
+CALLS = 200
+
+with open("resources/prompts/day_call_bot/main.txt") as f:
+    SYS_PROMPT = f.read()
+
+
+def start_call() -> float:
+    start = time.perf_counter()
+    engine = ResponseEngine(system_prompt=SYS_PROMPT)
+    engine.bot_id = "day_call_bot"
+    engine.initialize_defaults()
+    return (time.perf_counter() - start) * 1000
+
+
+def run(name: str, clear_cache: bool):
+    latencies = []
+    cpu_start = time.process_time()
+    for _ in range(CALLS):
+        if clear_cache:
+            rg._COMPILED_CHAINS.clear()
+        latencies.append(start_call())
+    cpu = (time.process_time() - cpu_start) * 1000 / CALLS
+    print(
+        f"{name:>9}: median {statistics.median(latencies):.3f} ms  "
+        f"p95 {statistics.quantiles(latencies, n=20)[-1]:.3f} ms  cpu/call {cpu:.3f} ms"
+    )
+
+
+if __name__ == "__main__":
+    run("uncached", clear_cache=True)
+    run("cached", clear_cache=False)
@@ -0,0 +1,137 @@
+# Event-loop lag during bursts of /dispatch requests: the previous handler with blocking Supabase,
+# Firestore and Twilio calls vs the current one awaiting the async Firestore client.
+# Network calls are replaced by fakes with fixed latency, no Firestore or Twilio traffic is made.
+# Run from server/: python -m sandbox.event_loop_lag_benchmark
+import asyncio
+import statistics
+import time
+from app.handlers import dispatch
+from app.services.core import userdata
+from app.services.core.userdata import UserDataService
+from app.services.ext import firebase_db, firebase_async
+
+BURST = 20
+ROUNDS = 5
+TICK = 0.005
+SUPABASE_LATENCY = 0.040
+FIRESTORE_LATENCY = 0.030
+TWILIO_LATENCY = 0.150
+
+USER_GOALS = {
+    "long_term_goals": ["Get in better shape", "Quit vaping"],
+    "habits": [{"name": "Gym", "description": "Go to the gym every day"}],
+}
+
+
+class FakeSnapshot:
+    exists = True
+
+    def to_dict(self):
+        return dict(USER_GOALS)
+
+
+class FakeDocument:
+    def __init__(self, is_async):
+        self.is_async = is_async
+
+    def get(self):
+        if self.is_async:
+            return self.aget()
+        time.sleep(FIRESTORE_LATENCY)
+        return FakeSnapshot()
+
+    async def aget(self):
+        await asyncio.sleep(FIRESTORE_LATENCY)
+        return FakeSnapshot()
+
+
+class FakeFirestore:
+    def __init__(self, is_async):
+        self.is_async = is_async
+
+    def collection(self, name):
+        return self
+
+    def document(self, doc_id):
+        return FakeDocument(self.is_async)
+
+
+class FakeSupabase:
+    def from_(self, table):
+        return self
+
+    def select(self, *args):
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def execute(self):
+        time.sleep(SUPABASE_LATENCY)
+        return type("Response", (), {"data": [{"id": "user", "first_name": "Michael", "phone_number": "+15550000000"}]})
+
+
+class FakeTwilio:
+    def __init__(self, *args):
+        self.calls = self
+
+    def create(self, **kwargs):
+        time.sleep(TWILIO_LATENCY)
+        return type("Call", (), {"sid": "CA00000000000000000000000000000000"})
+
+
+class FakeRequest:
+    async def json(self):
+        return {"target_phone_number": "+15550000000", "custom_params": {"user_id": "user", "first_name": "Michael"}}
+
+
+async def legacy_dispatch(request):
+    # Previous dispatch_call, blocking calls straight on the event loop
+    json_body = await request.json()
+    custom_params = json_body.get("custom_params")
+    user_data_service = UserDataService()
+    user_data_service.load_data_from_id(custom_params.get("user_id"))
+    user_data_service.fetch_goals()
+    user_data_service.fetch_habits()
+    custom_params["goals"] = user_data_service.get_goals_string()
+    custom_params["actions"] = user_data_service.get_habits_string()
+    dispatch.Client().calls.create(to=json_body.get("target_phone_number"), from_="+1 855 910 0592", twiml="")
+
+
+async def measure_lag(stop : asyncio.Event, lags : list):
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def bench(name, handler):
+    lags, bursts = [], []
+    for _ in range(ROUNDS):
+        stop = asyncio.Event()
+        ticker = asyncio.create_task(measure_lag(stop, lags))
+        start = time.perf_counter()
+        await asyncio.gather(*[handler(FakeRequest()) for _ in range(BURST)])
+        bursts.append(time.perf_counter() - start)
+        stop.set()
+        await ticker
+
+    lags_ms = sorted(lag * 1000 for lag in lags)
+    print(
+        f"{name:>8}: loop lag p50 {statistics.median(lags_ms):7.1f} ms  p99 {lags_ms[int(len(lags_ms) * 0.99)]:7.1f} ms  "
+        f"max {lags_ms[-1]:7.1f} ms  burst of {BURST} in {statistics.median(bursts) * 1000:.0f} ms"
+    )
+
+
+async def main():
+    firebase_db.get_db = lambda: FakeFirestore(is_async=False)
+    firebase_async.get_async_db = lambda: FakeFirestore(is_async=True)
+    userdata.supabase = FakeSupabase()
+    dispatch.Client = FakeTwilio
+
+    await bench("blocking", legacy_dispatch)
+    await bench("async", dispatch.dispatch_call)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,158 @@
+# Runs the user_goals subcollection migration and the new log and task accessors against an
+# in-memory Firestore, including legacy tasks whose dates are Firestore Timestamps.
+# Run from server/: python -m sandbox.firebase_migration_check
+import datetime
+from firebase_admin import firestore
+from app.services.ext import firebase_db, firebase_migrations
+
+
+class DatetimeWithNanoseconds(datetime.datetime):
+    # Stands in for google.api_core.datetime_helpers.DatetimeWithNanoseconds, which Firestore returns
+    pass
+
+
+STORE : dict[tuple, dict] = {}
+
+
+def apply_merge(current : dict, update : dict):
+    for key, value in update.items():
+        if value is firestore.DELETE_FIELD:
+            current.pop(key, None)
+        elif isinstance(value, firestore.ArrayUnion):
+            existing = current.get(key, [])
+            current[key] = existing + [item for item in value.values if item not in existing]
+        elif isinstance(value, dict) and isinstance(current.get(key), dict):
+            apply_merge(current[key], value)
+        else:
+            current[key] = value
+
+
+class FakeSnapshot:
+    def __init__(self, reference):
+        self.reference = reference
+        self.id = reference.path[-1]
+        self.exists = reference.path in STORE
+
+    def to_dict(self):
+        return dict(STORE[self.reference.path]) if self.exists else None
+
+
+class FakeDocument:
+    def __init__(self, path):
+        self.path = path
+
+    def collection(self, name):
+        return FakeCollection(self.path + (name,))
+
+    def set(self, data, merge=False):
+        if not merge:
+            STORE.pop(self.path, None)
+        apply_merge(STORE.setdefault(self.path, {}), data)
+
+    def update(self, data):
+        apply_merge(STORE[self.path], data)
+
+    def get(self):
+        return FakeSnapshot(self)
+
+
+class FakeCollection:
+    OPERATORS = {">=": lambda a, b: a >= b, "<=": lambda a, b: a <= b}
+
+    def __init__(self, path, filters=()):
+        self.path = path
+        self.filters = filters
+        self.order = None
+
+    def document(self, doc_id):
+        return FakeDocument(self.path + (doc_id,))
+
+    def where(self, filter):
+        return FakeCollection(self.path, self.filters + ((filter.field_path, filter.op_string, filter.value),))
+
+    def order_by(self, field):
+        self.order = field
+        return self
+
+    def select(self, fields):
+        return self
+
+    def stream(self):
+        paths = [path for path in STORE if path[:-1] == self.path]
+        docs = [FakeSnapshot(FakeDocument(path)) for path in paths]
+        docs = [doc for doc in docs if all(self.OPERATORS[op](doc.to_dict().get(field), value) for field, op, value in self.filters)]
+        if self.order is not None:
+            docs.sort(key=lambda doc: doc.to_dict().get(self.order))
+        return docs
+
+
+class FakeBatch:
+    def __init__(self):
+        self.writes = []
+
+    def set(self, ref, data, merge=False):
+        self.writes.append(lambda: ref.set(data, merge=merge))
+
+    def update(self, ref, data):
+        self.writes.append(lambda: ref.update(data))
+
+    def commit(self):
+        for write in self.writes:
+            write()
+
+
+class FakeFirestore:
+    def collection(self, name):
+        return FakeCollection((name,))
+
+    def batch(self):
+        return FakeBatch()
+
+
+def main():
+    firebase_db.get_db = firebase_migrations.get_db = FakeFirestore
+
+    STORE[("user_goals", "legacy")] = {
+        "habits": [{"name": "Gym"}],
+        "daily_action_logs": {
+            "2024-12-30": [{"Name": "Gym", "Description": "", "Completed": True}],
+            "2024-12-31": [{"Name": "Vaping", "Description": "", "Completed": False}],
+        },
+        "tasks": [
+            {"name": "Report", "dueDate": "2025-02-20T23:59:59Z", "priority": "High", "completed": False, "createdAt": "2025-02-18T10:00:00Z"},
+            {
+                "name": "Slides",
+                "dueDate": DatetimeWithNanoseconds(2025, 3, 1, tzinfo=datetime.timezone.utc),
+                "priority": "Low",
+                "completed": False,
+                "createdAt": DatetimeWithNanoseconds(2025, 2, 1, 9, tzinfo=datetime.timezone.utc),
+            },
+        ],
+    }
+    STORE[("user_goals", "new")] = {"habits": []}
+
+    dry_run = firebase_migrations.migrate_user_goals(dry_run=True)
+    assert "tasks" in STORE[("user_goals", "legacy")], "dry run wrote"
+    migrated = firebase_migrations.migrate_user_goals(batch_size=2)
+    rerun = firebase_migrations.migrate_user_goals()
+    print("dry run:", dry_run)
+    print("migrated:", migrated)
+    print("re-run:", rerun)
+    assert migrated["migrated_users"] == 1 and migrated["tasks"] == 2 and rerun["migrated_users"] == 0
+    assert STORE[("user_goals", "legacy")] == {"habits": [{"name": "Gym"}]}
+
+    firebase_db.log_daily_action_completion("legacy", "2024-12-31", "Gym", "", True)
+    firebase_db.log_daily_action_completion("legacy", "2025-01-01", "Gym", "", True)
+    assert list(firebase_db.get_daily_action_logs("legacy")) == ["2024-12-30", "2024-12-31", "2025-01-01"]
+    assert list(firebase_db.get_daily_action_logs("legacy", "2024-12-31", "2025-01-01")) == ["2024-12-31", "2025-01-01"]
+    assert [entry["Name"] for entry in firebase_db.get_daily_action_logs_for_date("legacy", "2024-12-31")] == ["Vaping", "Gym"]
+
+    # Re-adding a migrated task overwrites it instead of duplicating it
+    firebase_db.add_task_list("legacy", [dict(STORE[path]) for path in STORE if path[:3] == ("user_goals", "legacy", "tasks")])
+    tasks = firebase_db.get_task_list("legacy")
+    assert [task["name"] for task in tasks] == ["Slides", "Report"], tasks
+    print("tasks:", [path[-1] for path in STORE if path[:3] == ("user_goals", "legacy", "tasks")])
+
+
+if __name__ == "__main__":
+    main()
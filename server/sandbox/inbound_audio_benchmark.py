@@ -0,0 +1,71 @@
+# Inbound audio path, Twilio media frame to Deepgram send: CPU and sends per second of call audio.
+# Run from server/: python -m sandbox.inbound_audio_benchmark
+import asyncio
+import base64
+import json
+import os
+import time
+from app.services.ext.twilio import TwilioCallStreamClient, parse_media_payload
+from app.utils.audio import AudioFrameAggregator
+
+CALL_SECONDS = 600
+FRAME_BYTES = 160  # 20 ms of 8 kHz μ-law
+
+
+def media_frame(sequence : int) -> str:
+    # Same shape and key order as Twilio sends
+    return json.dumps({
+        "event": "media",
+        "sequenceNumber": str(sequence),
+        "media": {
+            "track": "inbound",
+            "chunk": str(sequence),
+            "timestamp": str(sequence * 20),
+            "payload": base64.b64encode(os.urandom(FRAME_BYTES)).decode("utf-8"),
+        },
+        "streamSid": "MZ00000000000000000000000000000000",
+    }, separators=(",", ":"))
+
+
+class CountingObserver:
+    def __init__(self):
+        self.sends = 0
+
+    async def on_event(self, event, data):
+        self.sends += 1
+
+
+async def legacy(frames, observer):
+    for raw in frames:
+        data = json.loads(raw)
+        if data.get("event") == "media":
+            await observer.on_event("audio_chunk", base64.b64decode(data["media"]["payload"]))
+
+
+async def aggregated(frames, observer, block_ms):
+    client = TwilioCallStreamClient([observer])
+    client.inbound_audio = AudioFrameAggregator(block_ms)
+    for raw in frames:
+        payload = parse_media_payload(raw)
+        await client.handle_media(payload)
+
+
+async def bench(name, run, frames):
+    observer = CountingObserver()
+    start = time.process_time()
+    await run(frames, observer)
+    elapsed = time.process_time() - start
+    print(f"{name:>16}: {observer.sends / CALL_SECONDS:5.1f} sends/s, {elapsed / CALL_SECONDS * 1e6:7.1f} us CPU per call-second")
+
+
+async def main():
+    frames = [media_frame(i) for i in range(CALL_SECONDS * 50)]
+    assert parse_media_payload(frames[0]) == json.loads(frames[0])["media"]["payload"]
+
+    await bench("legacy", legacy, frames)
+    for block_ms in (20, 60, 80, 100):
+        await bench(f"aggregated {block_ms}ms", lambda f, o: aggregated(f, o, block_ms), frames)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
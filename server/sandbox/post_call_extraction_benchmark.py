@@ -0,0 +1,92 @@
+# Per-transcript latency and tokens of the post-call extraction: the previous three-call chain
+# (goals, then a title per action, parsed with regexes) vs the single structured-output call.
+# Needs the Azure gpt-4o credentials, no Firestore writes are made.
+# Run from server/: python -m sandbox.post_call_extraction_benchmark
+import asyncio
+import re
+import statistics
+import time
+from langchain_community.callbacks import get_openai_callback
+from app.services.core.evaluation import CallUpdate, EXTRACTION_PROMPT
+from app.services.ext.azure_ai import get_llm
+from config import AzureModels
+
+ROUNDS = 5
+CONCURRENT_TRANSCRIPTS = 10
+
+# A copy of the shared client that reports usage in the stream, so the callback can count tokens.
+# The shared one is used by the whole process and must not be changed.
+_shared = get_llm(AzureModels.gpt_4o)
+LLM = _shared.model_copy(update={"model_kwargs": {**_shared.model_kwargs, "stream_options": {"include_usage": True}}})
+EXTRACTOR = LLM.with_structured_output(CallUpdate, method="json_schema", strict=True)
+
+TRANSCRIPT = """Coach: Hi Michael, I'm Goggins, your personal life coach. How's it going?
+User: I'm good, just really busy with school, I'm a bit behind in class.
+Coach: Got it. Shifting gears a bit, what's one long-term goal you have for this next year?
+User: I really want to get in better shape, lose some weight and build muscle.
+Coach: That's a great goal. What's another long-term goal you want to work on this year?
+User: Yea, I guess I want to quit my vaping addiction.
+Coach: What do you think you can do each day to work toward these goals?
+User: I can go to the gym every day.
+Coach: What's one more thing you can do daily to support your progress?
+User: I really get cravings during the morning, so maybe I can keep busy during that time.
+Coach: With these two daily habits you're setting yourself up for success. Talk soon!"""
+
+
+def openai_call(prompt: str) -> str:
+    return LLM.invoke(prompt).content.strip()
+
+
+def extract_call_update(transcript: str) -> CallUpdate:
+    return EXTRACTOR.invoke(EXTRACTION_PROMPT.format(transcript=transcript))
+
+
+def legacy_extraction(transcript: str) -> dict:
+    # Previous setup_evaluation, extract_goals_and_actions and extract_action_name
+    response = openai_call(f"""From the following transcript, extract the goals and the 2 daily actions.
+{transcript}
+
+Extract the goals and 2 daily action in the following format:
+
+Goal 1: [goal 1]
+Goal 2: [goal 2]
+
+Daily Action 1: [daily action 1]
+Daily Action 2: [daily action 2]""")
+
+    result = {
+        'goal1': re.search(r'Goal 1: (.*?)(?:\n|$)', response).group(1),
+        'goal2': re.search(r'Goal 2: (.*?)(?:\n|$)', response).group(1),
+        'action1': re.search(r'Daily Action 1: (.*?)(?:\n|$)', response).group(1),
+        'action2': re.search(r'Daily Action 2: (.*?)(?:\n|$)', response).group(1)
+    }
+    for key in ('action1', 'action2'):
+        result[f"{key}_title"] = openai_call(f"""From the action description below shorten it into a title that I can display in an app that encaspulates the action.Extract the name of the action in the following format and keep in less than 2 words. For example if the user says they want to drink water everyday the action name is "Water" or if they said they want to quit vaping the action name is "Vaping":
+Action Description: {result[key]}
+Action Title:""")
+    return result
+
+
+def bench(name, func):
+    latencies, tokens = [], []
+    for _ in range(ROUNDS):
+        with get_openai_callback() as cb:
+            start = time.perf_counter()
+            result = func(TRANSCRIPT)
+            latencies.append(time.perf_counter() - start)
+        tokens.append(cb.total_tokens)
+    print(f"{name:>12}: {statistics.median(latencies) * 1000:7.0f} ms p50, {statistics.mean(tokens):6.0f} tokens per transcript")
+    print(f"{'':>14}{result}")
+
+
+async def bench_concurrent():
+    start = time.perf_counter()
+    await asyncio.gather(*[EXTRACTOR.ainvoke(EXTRACTION_PROMPT.format(transcript=TRANSCRIPT)) for _ in range(CONCURRENT_TRANSCRIPTS)])
+    elapsed = time.perf_counter() - start
+    print(f"{'async':>12}: {CONCURRENT_TRANSCRIPTS} transcripts in {elapsed * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    bench("three calls", legacy_extraction)
+    bench("structured", extract_call_update)
+    asyncio.run(bench_concurrent())
@@ -0,0 +1,87 @@
+# Compares the incremental SentenceSegmenter with the previous get_response_sentences logic.
+# Run from server/: python -m sandbox.segmenter_benchmark
+import re
+import time
+from app.services.core.segmenter import SentenceSegmenter
+
+ROUNDS = 200
+TEXT = (
+    "That's a great question, Michael. Getting 7.5 hours of sleep is a solid target, "
+    "and Dr. Walker's research backs it up. Here's a plan:\n"
+    "1. Put your phone away at 10 p.m. every night.\n"
+    "2. Keep the room cool and dark so you fall asleep faster and stay asleep longer "
+    "through the whole night without waking up to check messages or notifications. "
+    "How does that sound to you?"
+)
+
+
+def tokenize(text: str) -> list[str]:
+    # Roughly how the model streams: words with their leading space
+    return re.findall(r"\s*\S+|\s+", text)
+
+
+def legacy_sentences(tokens: list[str]) -> list[str]:
+    # Previous get_response_sentences, minus the logging
+    sentences = []
+    curr_sentence = ""
+    prev_sentence = ""
+
+    for content in tokens:
+        curr_sentence = prev_sentence + curr_sentence
+        prev_sentence = ""
+        if content:
+            curr_sentence += content
+
+        if (
+            len(curr_sentence) == 1 and re.search(r"[.!?]", curr_sentence)
+        ) or re.match(r"^-?\d+\./$", curr_sentence.strip()):
+            curr_sentence = ""
+            continue
+
+        split_sentence = curr_sentence.split()
+        if (
+            "\n" in content
+            or re.search(r"[.!?]", content)
+            or ("," in content and len(split_sentence) > 3)
+        ):
+            sentences.append(curr_sentence)
+            curr_sentence = ""
+            continue
+
+        if len(split_sentence) > 14:
+            prev_sentence = " ".join(split_sentence[9:])
+            curr_sentence = " ".join(split_sentence[0:9]) + " "
+            sentences.append(curr_sentence)
+            curr_sentence = ""
+            continue
+
+    return sentences
+
+
+def incremental_sentences(tokens: list[str]) -> list[str]:
+    segmenter = SentenceSegmenter()
+    sentences = []
+    for token in tokens:
+        sentences.extend(segmenter.feed(token))
+    remainder = segmenter.flush()
+    if remainder:
+        sentences.append(remainder)
+    return sentences
+
+
+def bench(name, func, tokens, show=False):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        sentences = func(tokens)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>11}: {elapsed / (ROUNDS * len(tokens)) * 1e6:.2f} us/token")
+    for sentence in sentences if show else []:
+        print(f"{'':>13}| {sentence!r}")
+
+
+if __name__ == "__main__":
+    for label, text in (("reply", TEXT), ("long reply", " ".join([TEXT] * 20))):
+        tokens = tokenize(text)
+        print(f"\n{label}: {len(tokens)} tokens")
+        bench("legacy", legacy_sentences, tokens, show=label == "reply")
+        bench("incremental", incremental_sentences, tokens, show=label == "reply")
@@ -0,0 +1,70 @@
+# Per-token overhead and CPU per call of the astream_events path vs the direct streaming path.
+# Uses a local fake chat model, so only our own streaming overhead is measured.
+# Run from server/: python -m sandbox.streaming_benchmark
+import os
+import asyncio
+import time
+
+for key in ("AZURE_KEY_AI_gpt4o", "AZURE_KEY_AI_gpt4omini", "AZURE_KEY_ADA_EMBEDDINGS"):
+    os.environ.setdefault(key, "benchmark")
+for key in ("AZURE_ENDPOINT_AI_gpt4o", "AZURE_ENDPOINT_AI_gpt4omini", "AZURE_ENDPOINT_ADA_EMBEDDINGS"):
+    os.environ.setdefault(key, "https://benchmark.openai.azure.com")
+
+from langchain.memory import ChatMessageHistory
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+from app.services.core import response_tools as rg
+
+CALLS = 50
+REPLY = " ".join(["That's a great step forward, keep showing up every day."] * 8)
+# A backchannel turn skips retrieval, leaving only the streaming path itself
+USER_INPUT = "okay thanks"
+
+
+def fake_llm(calls: int) -> GenericFakeChatModel:
+    return GenericFakeChatModel(messages=iter([REPLY] * calls))
+
+
+async def run_events(prompt_template, vector_store) -> tuple[int, float]:
+    llm = fake_llm(CALLS)
+    chain = rg.get_default_retrieval_chain(None, prompt_template, llm=llm)
+    tokens = 0
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        async for chunk in rg.get_response_stream(
+            chain, USER_INPUT, ChatMessageHistory(), {"state": {}}, vector_store=vector_store
+        ):
+            tokens += 1
+    return tokens, time.perf_counter() - start
+
+
+async def run_direct(prompt_template, vector_store) -> tuple[int, float]:
+    llm = fake_llm(CALLS)
+    tokens = 0
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        async for chunk in rg.get_direct_response_stream(
+            prompt_template, llm, vector_store, USER_INPUT, ChatMessageHistory(), {"state": {}}
+        ):
+            tokens += 1
+    return tokens, time.perf_counter() - start
+
+
+async def main():
+    prompt_template = rg.get_prompt_template("You are a coach. Context: {context} State: {state}")
+    vector_store = FAISS.from_texts(["Situation: placeholder"], DeterministicFakeEmbedding(size=8))
+
+    for name, runner in (("events", run_events), ("direct", run_direct)):
+        cpu_start = time.process_time()
+        tokens, wall = await runner(prompt_template, vector_store)
+        cpu = time.process_time() - cpu_start
+        cpu_per_call = cpu / CALLS
+        print(
+            f"{name:>6}: {wall / tokens * 1e6:.1f} us/token  "
+            f"{cpu_per_call * 1000:.2f} ms CPU/call  ~{1 / cpu_per_call:.0f} responses/core-second"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,30 @@
+# Rule-based turn classification on short utterances, without the offline model.
+# Short answers to the coach's questions must keep retrieval, only pure backchannel may skip it.
+# Run from server/: python -m sandbox.turn_classifier_check
+from app.services.core.turn_classifier import TurnClassifier, TurnType
+
+TRIVIAL = [
+    "", "yes", "Okay.", "mhm", "yeah okay", "thanks", "Thank you!", "okay thank you so much",
+    "sounds good, bye", "got it", "alright, talk to you later", "no worries", "cool cool",
+    "okay, talk to you later, bye",
+]
+
+SUBSTANTIVE = [
+    "I will do that", "I do", "well I do a lot for that", "so I see it", "I will", "I did it",
+    "not really", "no", "the gym", "a lot", "I see you tomorrow at the gym", "thank you for the plan, what next",
+    "yes I went running", "okay but I skipped it",
+]
+
+
+if __name__ == "__main__":
+    classifier = TurnClassifier()
+    failures = [
+        (utterance, expected)
+        for expected, utterances in ((TurnType.TRIVIAL, TRIVIAL), (TurnType.SUBSTANTIVE, SUBSTANTIVE))
+        for utterance in utterances
+        if classifier.classify(utterance) != expected
+    ]
+    for utterance, expected in failures:
+        print(f"expected {expected.value}: {utterance!r}")
+    print(f"{len(TRIVIAL) + len(SUBSTANTIVE) - len(failures)}/{len(TRIVIAL) + len(SUBSTANTIVE)} classified as expected")
+    assert not failures
@@ -0,0 +1,60 @@
+# Compares query latency of the in-heap FAISS store against the memory-mapped snapshot store.
+# Run from server/: python -m sandbox.vector_store_benchmark
+import tempfile
+import time
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import FakeEmbeddings
+from app.services.core.mmap_store import MmapVectorStore
+
+DIMENSIONS = 1536
+ROWS = 2_000
+QUERIES = 2_000
+K = 3
+
+
+def time_queries(store, queries) -> np.ndarray:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        store.similarity_search_by_vector(query, k=K)
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000
+
+
+def report(name, latencies):
+    print(
+        f"{name:>8}: p50 {np.percentile(latencies, 50):.3f} ms  "
+        f"p99 {np.percentile(latencies, 99):.3f} ms  mean {latencies.mean():.3f} ms"
+    )
+
+
+def main():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((ROWS, DIMENSIONS), dtype=np.float32)
+    queries = rng.standard_normal((QUERIES, DIMENSIONS), dtype=np.float32).tolist()
+    texts = [f"Situation: {i}" for i in range(ROWS)]
+    ids = [str(i) for i in range(ROWS)]
+    embeddings = FakeEmbeddings(size=DIMENSIONS)
+
+    faiss_store = FAISS.from_embeddings(list(zip(texts, vectors.tolist())), embeddings, ids=ids)
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        MmapVectorStore.save(directory, vectors, ids, [faiss_store.docstore.search(id) for id in ids])
+        mmap_store = MmapVectorStore.load(directory, embeddings)
+        print(f"Snapshot write + open: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        # Same ranking from both stores
+        for query in queries[:20]:
+            expected = [doc.page_content for doc in faiss_store.similarity_search_by_vector(query, k=K)]
+            actual = [doc.page_content for doc in mmap_store.similarity_search_by_vector(query, k=K)]
+            assert expected == actual, (expected, actual)
+
+        print(f"{ROWS} rows x {DIMENSIONS} dims, {QUERIES} queries, k={K}")
+        report("faiss", time_queries(faiss_store, queries))
+        report("mmap", time_queries(mmap_store, queries))
+
+
+if __name__ == "__main__":
+    main()
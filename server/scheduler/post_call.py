@@ -0,0 +1,103 @@
+from celery_app import celery_app
+from config import REDISCLOUD_URL, POST_CALL_QUEUE, POST_CALL_MAX_RETRIES
+import app.services.core.evaluation as evaluation
+from typing import Optional
+import redis
+
+POST_CALL_TASK = "scheduler.post_call.process_call"
+
+# A worker that dies mid-task frees the call after this long, so a redelivery can pick it up
+LOCK_TTL = 15 * 60
+DONE_TTL = 7 * 24 * 60 * 60
+STATS_KEY = "post_call:stats"
+
+_redis : Optional[redis.Redis] = None
+
+def get_redis() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(REDISCLOUD_URL)
+    return _redis
+
+
+def _count(r : redis.Redis, field : str):
+    # Counters are best effort, they must never fail or retry the task
+    try:
+        r.hincrby(STATS_KEY, field)
+    except redis.RedisError as e:
+        print(f"Could not count post-call {field}: ", e)
+
+
+def _release(r : redis.Redis, lock_key : str, owner : str):
+    try:
+        if r.get(lock_key) == owner.encode():
+            r.delete(lock_key)
+    except redis.RedisError as e:
+        print(f"Could not release {lock_key}, it expires in {LOCK_TTL}s: ", e)
+
+
+@celery_app.task(
+    name=POST_CALL_TASK,
+    bind=True,
+    acks_late=True,
+    max_retries=POST_CALL_MAX_RETRIES,
+)
+def process_call(self, call_id: str, user_id: str, transcript: str, evaluated: bool = False):
+    r = get_redis()
+    done_key = f"post_call:done:{call_id}"
+    lock_key = f"post_call:lock:{call_id}"
+
+    # Redis errors are retried like evaluation errors. Once the update is applied, retries only
+    # record it as done, so a failed done marker never runs the update twice.
+    try:
+        # Retries keep the task id, so they get back the lock they already hold
+        if r.exists(done_key) or not (
+            r.set(lock_key, self.request.id, nx=True, ex=LOCK_TTL) or r.get(lock_key) == self.request.id.encode()
+        ):
+            print(f"Post-call update for {call_id} already done or in progress, skipping")
+            _count(r, "duplicates")
+            return
+
+        if not evaluated:
+            evaluation.setup_up_call_update(transcript, user_id)
+            evaluated = True
+
+        r.set(done_key, 1, ex=DONE_TTL)
+    except Exception as e:
+        if not evaluated:
+            _release(r, lock_key, self.request.id)
+        if self.request.retries >= self.max_retries:
+            _count(r, "failed")
+            raise
+        _count(r, "retried")
+        print(f"Post-call update for {call_id} failed, retrying: ", e)
+        raise self.retry(exc=e, countdown=30 * 2 ** self.request.retries, kwargs={"evaluated": evaluated})
+
+    _release(r, lock_key, self.request.id)
+    _count(r, "processed")
+
+
+def enqueue_post_call(call_id: str, user_id: str, transcript: str):
+    # Blocking publish, call it off the event loop
+    process_call.apply_async(
+        args=[call_id, user_id, transcript],
+        task_id=f"post_call:{call_id}",
+    )
+
+
+def post_call_stats() -> dict:
+    """Queue depth from a passive declare, plus the worker counters kept in Redis. Blocking."""
+    stats = {"queue": POST_CALL_QUEUE}
+    try:
+        with celery_app.connection_for_write() as connection:
+            _, messages, consumers = connection.default_channel.queue_declare(queue=POST_CALL_QUEUE, passive=True)
+        stats.update({"depth": messages, "consumers": consumers})
+    except Exception as e:
+        stats["queue_error"] = str(e)
+
+    try:
+        counters = get_redis().hgetall(STATS_KEY)
+        stats.update({key.decode(): int(value) for key, value in counters.items()})
+    except Exception as e:
+        stats["redis_error"] = str(e)
+    return stats
@@ -11,7 +11,7 @@ export PYTHONPATH="${PYTHONPATH}:$(pwd)"
 # Function to start worker
 start_worker() {
     echo -e "${GREEN}Starting Celery worker...${NC}"
-    celery -A celery_app:celery_app worker --loglevel=$LOGLEVEL &
+    celery -A celery_app:celery_app worker -Q celery,${POST_CALL_QUEUE:-post_call} --loglevel=$LOGLEVEL &
 }
 
 # Function to start beat